@@ -0,0 +1,77 @@
+# Times the per-generation sorts of NSGA2Fitness objects on a large population:
+# sorting with the rich crowded-comparison operators against sorting with the
+# precomputed sort_key, and comparing against plain numbers through the cached
+# mean. Also reports the memory taken by the fitness objects.
+#
+# Run from the repository root:
+#   python benchmarks/fitness_benchmark.py --size 10000
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from nsga2.fitness import NSGA2Fitness
+
+
+class BenchmarkGenome:
+    def __init__(self, key, fitness):
+        self.key = key
+        self.fitness = fitness
+
+
+def time_call(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def make_fitnesses(rng, n, m):
+    fitnesses = []
+    for values in rng.normal(size=(n, m)):
+        fitness = NSGA2Fitness(0.0, values)
+        fitness.rank = -int(rng.integers(0, 20))
+        fitness.crowding_dist = float(rng.random())
+        fitnesses.append(fitness)
+    return fitnesses
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", help="Number of genomes", type=int, default=10000)
+    parser.add_argument("--objectives", help="Number of objectives", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    fitnesses = make_fitnesses(rng, args.size, args.objectives)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print('{0} fitness objects: {1:.1f} bytes each (values arrays included)'.format(
+        args.size, (after - before) / args.size))
+
+    genomes = [BenchmarkGenome(k, f) for k, f in enumerate(fitnesses)]
+    rich = time_call(lambda: sorted(genomes, key=lambda g: g.fitness, reverse=True))
+    keyed = time_call(lambda: sorted(genomes, key=lambda g: g.fitness.sort_key, reverse=True))
+    print('sort by crowded comparison: {0:.4f} s'.format(rich))
+    print('sort by sort_key:           {0:.4f} s ({1:.1f}x)'.format(keyed, rich / keyed))
+
+    uncached = time_call(lambda: [np.mean(f.values) > 0.0 for f in fitnesses])
+    cached = time_call(lambda: [f > 0.0 for f in fitnesses])
+    print('compare with a number, np.mean each time: {0:.4f} s'.format(uncached))
+    print('compare with a number, cached mean:       {0:.4f} s ({1:.1f}x)'.format(cached, uncached / cached))
+
+
+if __name__ == "__main__":
+    main()
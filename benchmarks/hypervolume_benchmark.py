@@ -0,0 +1,111 @@
+# Times the hypervolumes of stats/hypervolume.py against pymoo on random
+# fronts of two and three objectives, as well as the incremental hypervolume
+# over a front that changes a little every generation, and shows how far they
+# are apart. For more objectives the Monte Carlo estimate is timed against
+# pymoo, and how often its confidence interval holds the exact value is
+# counted. tests/test_hypervolume.py asserts the agreement.
+#
+# Run from the repository root:
+#   python benchmarks/hypervolume_benchmark.py --sizes 100 1000
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from pymoo.indicators.hv import HV
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from nsga2.sorting import iter_non_dominated_fronts
+from stats.hypervolume import IncrementalHypervolume, hypervolume, monte_carlo_hypervolume
+
+
+def pymoo_hypervolume(ref_point, points):
+    return HV(ref_point=-ref_point)(-points)
+
+
+def random_front(rng, n, m):
+    # Points on a concave surface, spread out in front of the reference point
+    points = np.abs(rng.normal(size=(n, m)))
+    points /= np.linalg.norm(points, axis=1, keepdims=True)
+    return points * 100 - 50 + rng.normal(scale=5, size=(n, m))
+
+
+def time_call(func, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def non_dominated(points):
+    return points[next(iter_non_dominated_fronts(points))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--objectives", type=int, nargs="+", default=[2, 3])
+    parser.add_argument("--sizes", help="Numbers of points", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--monte_carlo_objectives", type=int, nargs="+", default=[4, 5, 6])
+    parser.add_argument("--repeats", help="Estimates per front of the Monte Carlo check", type=int, default=20)
+    parser.add_argument("--generations", help="Generations of the incremental run", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    for m in args.objectives:
+        ref_point = np.full(m, -100.0)
+        print('\n{0} objectives'.format(m))
+        print('{0:>8} {1:>10} {2:>10} {3:>12}'.format('N', 'pymoo', 'exact', 'difference'))
+        for n in args.sizes:
+            # Dominated points and points behind the reference point included
+            points = random_front(rng, n, m)
+            points[:n // 10] = ref_point - 1
+            pymoo_time, expected = time_call(pymoo_hypervolume, ref_point, points)
+            exact_time, value = time_call(hypervolume, ref_point, points)
+            print('{0:>8d} {1:>10.4f} {2:>10.4f} {3:>12.3e}'.format(
+                n, pymoo_time, exact_time, abs(value - expected) / expected))
+
+        # A front that loses and gains a few points every generation
+        incremental = IncrementalHypervolume(ref_point)
+        pool = random_front(rng, 400, m)
+        worst = 0.0
+        incremental_time = full_time = 0.0
+        for _ in range(args.generations):
+            pool[rng.integers(len(pool), size=5)] = random_front(rng, 5, m)
+            front = non_dominated(pool)
+            start = time.perf_counter()
+            value = incremental.update(front)
+            incremental_time += time.perf_counter() - start
+            start = time.perf_counter()
+            expected = pymoo_hypervolume(ref_point, front)
+            full_time += time.perf_counter() - start
+            worst = max(worst, abs(value - expected) / expected)
+        print('Incremental over {0} generations: {1:.4f}s, pymoo {2:.4f}s, largest difference {3:.3e}'.format(
+            args.generations, incremental_time, full_time, worst))
+
+    for m in args.monte_carlo_objectives:
+        ref_point = np.full(m, -100.0)
+        print('\n{0} objectives, Monte Carlo estimates at 1% error'.format(m))
+        print('{0:>8} {1:>10} {2:>10} {3:>12} {4:>10}'.format('N', 'pymoo', 'estimate', 'difference', 'covered'))
+        for n in args.sizes:
+            points = non_dominated(random_front(rng, n, m))
+            pymoo_time, expected = time_call(pymoo_hypervolume, ref_point, points, repeat=1)
+            covered = 0
+            estimate_time = worst = 0.0
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                value, (low, high) = monte_carlo_hypervolume(ref_point, points, rng=rng)
+                estimate_time += time.perf_counter() - start
+                covered += low <= expected <= high
+                worst = max(worst, abs(value - expected) / expected)
+            print('{0:>8d} {1:>10.4f} {2:>10.4f} {3:>12.3e} {4:>9.0%}'.format(
+                n, pymoo_time, estimate_time / args.repeats, worst, covered / args.repeats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# Times IGD and IGD+ of many run fronts against a dense known front with
+# pymoo and with the ReferenceFront of stats/front_metrics.py, one front at a
+# time and all fronts over a thread pool, and checks that the values agree.
+#
+# Run from the repository root:
+#   python benchmarks/igd_benchmark.py --reference 100000 --fronts 100
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from pymoo.indicators.igd import IGD
+from pymoo.indicators.igd_plus import IGDPlus
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from stats.front_metrics import ReferenceFront, front_metrics_many
+
+
+def quarter_circle(rng, n, m, noise=0.0):
+    points = np.abs(rng.normal(size=(n, m)))
+    points /= np.linalg.norm(points, axis=1, keepdims=True)
+    return points * 100 - rng.random((n, 1)) * noise
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reference", help="Points of the known front", type=int, default=100000)
+    parser.add_argument("--fronts", help="Number of run fronts", type=int, default=100)
+    parser.add_argument("--size", help="Points per run front", type=int, default=30)
+    parser.add_argument("--objectives", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    known = quarter_circle(rng, args.reference, args.objectives)
+    fronts = [np.unique(quarter_circle(rng, args.size, args.objectives, noise=20), axis=0)
+              for _ in range(args.fronts)]
+
+    start = time.perf_counter()
+    # pymoo minimises, IGD+ needs the negated values
+    expected = [(IGD(known)(front), IGDPlus(-known)(-front)) for front in fronts]
+    pymoo_time = time.perf_counter() - start
+
+    reference = ReferenceFront(known)
+    start = time.perf_counter()
+    serial = [reference.distances(front) for front in fronts]
+    serial_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parallel = front_metrics_many(fronts, reference_front=reference, workers=args.workers)
+    parallel_time = time.perf_counter() - start
+
+    difference = max(max(abs(a - c), abs(b - d)) / max(a, 1e-12)
+                     for (a, b), (c, d) in zip(expected, serial))
+    same = all((m.igd, m.igd_plus) == values for m, values in zip(parallel, serial))
+    print("{0} fronts of {1} points against {2} reference points".format(args.fronts, args.size, args.reference))
+    print("pymoo:          {0:.3f}s".format(pymoo_time))
+    print("ReferenceFront: {0:.3f}s ({1:.1f}x)".format(serial_time, pymoo_time / serial_time))
+    print("All metrics, thread pool: {0:.3f}s".format(parallel_time))
+    print("Largest relative difference to pymoo: {0:.3e}, parallel run identical: {1}".format(difference, same))
+
+
+if __name__ == "__main__":
+    main()
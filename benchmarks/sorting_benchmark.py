@@ -0,0 +1,76 @@
+# Times the non-dominated sorting algorithms of nsga2/sorting.py against the
+# original NSGA2Reproduction.fast_non_dominated_sort on random populations of
+# growing size, to find where the sub-quadratic algorithms take over.
+#
+# Run from the repository root:
+#   python benchmarks/sorting_benchmark.py --objectives 2 3
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from nsga2.fitness import NSGA2Fitness
+from nsga2.reproduction import NSGA2Reproduction
+from nsga2.sorting import vectorized_non_dominated_sort, sweep_non_dominated_sort, best_order_sort
+
+
+class BenchmarkGenome:
+    def __init__(self, key, values):
+        self.key = key
+        self.fitness = NSGA2Fitness(0.0, values)
+
+
+def time_call(func, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--objectives", help="Numbers of objectives to benchmark", type=int, nargs="+", default=[2, 3])
+    parser.add_argument("--sizes", help="Population sizes to benchmark", type=int, nargs="+",
+                        default=[100, 200, 400, 800, 1600, 3200, 6400, 12800])
+    parser.add_argument("--python_max_size", help="Largest size to run the pure Python sort on", type=int, default=1600)
+    parser.add_argument("--numpy_max_size", help="Largest size to build the dominance matrix for", type=int, default=6400)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    # The Python sort is an instance method that does not touch any state
+    reproduction = NSGA2Reproduction.__new__(NSGA2Reproduction)
+
+    for m in args.objectives:
+        algorithms = [('numpy', vectorized_non_dominated_sort, args.numpy_max_size)]
+        if m == 2:
+            algorithms.append(('sweep', sweep_non_dominated_sort, None))
+        algorithms.append(('best_order', best_order_sort, None))
+
+        print('\n{0} objectives'.format(m))
+        print('{0:>8} {1:>10} '.format('N', 'python') + ' '.join('{0:>10}'.format(name) for name, _, _ in algorithms))
+        for n in args.sizes:
+            objectives = rng.normal(size=(n, m))
+            row = '{0:>8d} '.format(n)
+            if n <= args.python_max_size:
+                population = {k: BenchmarkGenome(k, list(v)) for k, v in enumerate(objectives)}
+                row += '{0:>10.4f} '.format(time_call(reproduction.fast_non_dominated_sort, population, repeat=1))
+            else:
+                row += '{0:>10} '.format('-')
+            for _, algorithm, max_size in algorithms:
+                if max_size is not None and n > max_size:
+                    row += '{0:>10} '.format('-')
+                else:
+                    row += '{0:>10.4f} '.format(time_call(algorithm, objectives))
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# Times speciation of mutated populations with neat's DefaultSpeciesSet and
+# with the vectorized NSGA2SpeciesSet, and checks that both give the same
+# species assignments. A low compatibility threshold gives many species;
+# with few, NSGA2SpeciesSet falls back to the loop of DefaultSpeciesSet.
+#
+# Run from the repository root:
+#   python benchmarks/speciation_benchmark.py --size 300 --threshold 2
+
+import argparse
+import copy
+import os
+import random
+import sys
+import time
+
+import neat
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from nsga2.reproduction import NSGA2Reproduction
+from nsga2.species import NSGA2SpeciesSet
+
+
+def load_config(path, species_set_type, threshold):
+    # Both species sets read the [DefaultSpeciesSet] section
+    config = neat.Config(neat.DefaultGenome, NSGA2Reproduction, neat.DefaultSpeciesSet, neat.DefaultStagnation, path)
+    config.species_set_type = species_set_type
+    config.species_set_config.compatibility_threshold = threshold
+    return config
+
+
+def make_generations(config, size, generations, mutations):
+    # Populations of increasingly mutated genomes, each a child of the last
+    genomes = {}
+    for key in range(size):
+        g = config.genome_type(key)
+        g.configure_new(config.genome_config)
+        genomes[key] = g
+    populations = []
+    next_key = size
+    for _ in range(generations):
+        children = {}
+        for parent in genomes.values():
+            child = copy.deepcopy(parent)
+            child.key = next_key
+            next_key += 1
+            for _ in range(mutations):
+                child.mutate(config.genome_config)
+            children[child.key] = child
+        genomes = children
+        populations.append(genomes)
+    return populations
+
+
+def time_speciation(config, species_set_type, populations):
+    species_set = species_set_type(config.species_set_config, neat.reporting.ReporterSet())
+    assignments = []
+    start = time.perf_counter()
+    for generation, population in enumerate(populations):
+        species_set.speciate(config, population, generation)
+        assignments.append(dict(species_set.genome_to_species))
+    return time.perf_counter() - start, assignments, len(species_set.species)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", type=str, default='configs/tuned/moneat_ant.config')
+    parser.add_argument("--size", help="Number of genomes", type=int, default=300)
+    parser.add_argument("--generations", type=int, default=10)
+    parser.add_argument("--mutations", help="Mutations per child", type=int, default=3)
+    parser.add_argument("--threshold", help="Compatibility threshold", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    default_config = load_config(args.config, neat.DefaultSpeciesSet, args.threshold)
+    nsga2_config = load_config(args.config, NSGA2SpeciesSet, args.threshold)
+
+    random.seed(args.seed)
+    populations = make_generations(default_config, args.size, args.generations, args.mutations)
+
+    random.seed(args.seed)
+    default_time, default_assignments, species = time_speciation(default_config, neat.DefaultSpeciesSet,
+                                                                 populations)
+    random.seed(args.seed)
+    nsga2_time, nsga2_assignments, _ = time_speciation(nsga2_config, NSGA2SpeciesSet, populations)
+
+    print("{0} genomes, {1} generations, {2} species at the end".format(args.size, args.generations, species))
+    print("DefaultSpeciesSet: {0:.3f}s".format(default_time))
+    print("NSGA2SpeciesSet:   {0:.3f}s ({1:.1f}x)".format(nsga2_time, default_time / nsga2_time))
+    print("Same assignments: {0}".format(default_assignments == nsga2_assignments))
+
+
+if __name__ == '__main__':
+    main()
@@ -8,7 +8,7 @@ import matplotlib.pyplot as plt
 
 from scipy.spatial import ConvexHull
 
-from performance_indicators import hypervolume
+from performance_indicators import IncrementalHypervolume
 
 import seaborn as sns
 
@@ -17,12 +17,6 @@ def extract_number_from_filename(file_path):
     match = re.search(r'front_(\d+)_', filename)
     return int(match.group(1))
 
-def calculate_hypervolume(pareto_front):
-    # Assume the reference point is at zero for simplicity
-    reference_point = [-100, -100]
-    
-    return hypervolume(np.array([-100,-100]), pareto_front)
-
 def download_pareto_fronts(project, entity, folder_path):
     api_key = os.getenv("WANDB_API")
     wandb.login(key=api_key)
@@ -40,6 +34,8 @@ def download_pareto_fronts(project, entity, folder_path):
         if files:
             files.sort(key=extract_number_from_filename)
             hypervolumes = []
+            # The fronts of consecutive generations share most of their points
+            incremental = IncrementalHypervolume(np.array([-100, -100]))
 
             for file_name in files:
                 file_path = os.path.join(folder_path, file_name)
@@ -48,7 +44,7 @@ def download_pareto_fronts(project, entity, folder_path):
                 with open(file_path, 'r') as f:
                     pareto_front = json.load(f)
 
-                hypervolume = calculate_hypervolume(np.array(pareto_front["data"]))
+                hypervolume = incremental.update(np.array(pareto_front["data"]))
                 hypervolumes.append(hypervolume)
             #hypervolumes = np.sort(hypervolumes)
 
@@ -6,7 +6,7 @@ import os
 import json
 import numpy as np
 import pandas as pd
-from performance_indicators import hypervolume, spacing, sparsity, inverted_generational_distance
+from performance_indicators import front_metrics_many, load_reference_front
 import argparse
 
 def calculate_metrics(name, folder_path, output_path, has_known_pareto_front=True):
@@ -14,12 +14,7 @@ def calculate_metrics(name, folder_path, output_path, has_known_pareto_front=Tru
     files = os.listdir(folder_path)
     # Only keep the .json files
     files = [file for file in files if file.endswith(".json")]
-    # Open each file and calculate the metrics
-    hypervolumes = []
-    cardinalities = []
-    idgs = []
-    spacings = []
-    sparsities = []
+    # Open each file and collect the fronts
     fronts = []
     for file in files:
         with open(os.path.join(folder_path, file), "r") as f:
@@ -29,38 +24,24 @@ def calculate_metrics(name, folder_path, output_path, has_known_pareto_front=Tru
 
     
             # Transform the array into a set of unique points
-            pareto_front = np.unique(pareto_front, axis=0)
-            # Calculate the metrics
-            hv = hypervolume(np.array([-100,-100]),pareto_front)
-            s = sparsity(pareto_front)
-            #sp = spacing(pareto_front)
-            cardinality = len(pareto_front)
+            fronts.append(np.unique(pareto_front, axis=0))
 
-            # If we have a known pareto front, calculate the generational distance and inverted generational distance
-            if has_known_pareto_front:
-                # Load front from file
-                with open("fronts/swimmer_front.json", "r") as f:
-                    known_pareto_front = np.array(json.load(f)["data"])
-                    idg = inverted_generational_distance(known_pareto_front, pareto_front)
-            else: 
-                idg = None
-            # Save the metrics
-            hypervolumes.append(hv)
-            cardinalities.append(cardinality)
-            spacings.append(s)
-            #sparsities.append(sp)
-            idgs.append(idg)
-            fronts.append(pareto_front.tolist())
+    # If we have a known pareto front, calculate the inverted generational distances
+    # against it, the front is read once and kept for later calls
+    known_pareto_front = load_reference_front("fronts/swimmer_front.json") if has_known_pareto_front else None
+    # Calculate the metrics of all fronts in parallel
+    results = front_metrics_many(fronts, ref_point=np.array([-100,-100]), reference_front=known_pareto_front)
 
     # Save the metrics to a json file
     metrics = {
         "name": name,
-        "hypervolume": hypervolumes,
-        "cardinality": cardinalities,
-        "spacing": spacings,
-        "sparsity": sparsities,
-        "inverted_generational_distance": idgs,
-        "pareto_fronts": fronts
+        "hypervolume": [m.hypervolume for m in results],
+        "cardinality": [m.cardinality for m in results],
+        "spacing": [m.spacing for m in results],
+        "sparsity": [m.sparsity for m in results],
+        "inverted_generational_distance": [m.igd for m in results],
+        "inverted_generational_distance_plus": [m.igd_plus for m in results],
+        "pareto_fronts": [front.tolist() for front in fronts]
     }
 
     with open(output_path, "w") as f:
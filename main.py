@@ -5,13 +5,26 @@ import argparse
 
 import neat.config
 from nsga2.fitness import NSGA2Fitness
+from nsga2.cache import CachedEvaluator
+from nsga2.checkpoint import NSGA2Checkpointer
+from nsga2.curriculum import HorizonCurriculum
+from nsga2.distributed import DistributedEvaluator, read_authkey
+from nsga2.islands import IslandRunner
+from nsga2.instrumentation import record
+from nsga2.parallel import NSGA2ParallelEvaluator
+from nsga2.rollout import LockstepEvaluator
 from nsga2.population import NSGA2Population
 from nsga2.reproduction import NSGA2Reproduction
+from nsga2.species import select_species_set
+from nsga2.resampling import ResamplingEvaluator
+from nsga2.seeding import episode_seeds, seed_env
 from matplotlib import pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 import numpy as np
 import wandb
 from stats.moreporter import MOReporter
+from stats.sinks import BufferedSink, JsonlSink, WandbSink
+from stats.throughput import ThroughputReporter
 
 from dotenv import load_dotenv
 import os
@@ -31,26 +44,36 @@ env = gym.make(ENV_ID)
 reward_dim = env.unwrapped.reward_space.shape[0]
 
 
-def eval_genomes(genomes, config):
-    for genome_id, genome in genomes:
-        genome.fitness = NSGA2Fitness(0.0, [0.0, 0.0, 0.0])
+def clip_action(output):
+    return np.clip(np.array(output), -1, 1)
+
+
+def eval_genome(genome, config, env):
+    net = neat.nn.RecurrentNetwork.create(genome, config)
+    observation, info = env.reset()
+
+    fitness = np.zeros(env.unwrapped.reward_space.shape[0])
+    steps = 0
+    while True:
+        output = net.activate(observation)
+        action = clip_action(output)
+        #action = np.argmax(output)
+        observation, vector_reward, terminated, truncated, info = env.step(action)
+        fitness = np.add(fitness, vector_reward)
+        steps += 1
 
-        net = neat.nn.RecurrentNetwork.create(genome, config)
-        observation, info =env.reset()
+        if terminated or truncated:
+            break
 
-        done = False
-        fitness = np.zeros(2)
-        while not done:
-            output = net.activate(observation)
-            action = np.clip(np.array(output), -1, 1)
-            #action = np.argmax(output)
-            observation, vector_reward, terminated, truncated, info = env.step(action)
-            fitness = np.add(fitness, vector_reward)
+    record(steps=steps, activations=steps)
+    return fitness
 
-            if terminated or truncated:
-                break
 
-        genome.fitness.values = fitness
+def eval_genomes(genomes, config):
+    # Episodes are seeded from the checkpointed numpy random state, so a resumed run plays the same ones
+    for (genome_id, genome), seed in zip(genomes, episode_seeds(len(genomes))):
+        seed_env(env, seed)
+        genome.fitness = NSGA2Fitness(0.0, eval_genome(genome, config, env))
         env.close()
 
 
@@ -80,42 +103,140 @@ def setup_wandb(project, entity, seed, config):
 def close_wandb():
     wandb.finish()
 
+def log_front(front, sink, offline=False, filename='front.png'):
+    # Print best 10 genomes as points in a 2d space with the objective values as coordinates using matplotlib
+    plt.scatter(front[:, 1], front[:, 0])
+    plt.xlabel("Time reward")
+    plt.ylabel("Treasure reward")
+    plt.title("MONEAT Pareto Front")
+
+    # Everything logged during the run goes out before the plot
+    sink.close()
+    if offline:
+        plt.savefig(filename)
+        return
+
+    wandb.log({"final_front_plot": plt})
+    close_wandb()
+    #plt.show()
+
+
 # main method
-def main(seed):
+def main(seed, workers=1, lanes=1, cache_size=0, checkpoint_dir='checkpoints', resume=None, coordinator=None,
+         horizons=None, resample=0, islands=1, offline=False, authkey_file=None, coordinator_host=None):
+    if resume is not None and (horizons or cache_size > 0):
+        # Neither the curriculum stage nor the cache contents are part of a checkpoint
+        raise RuntimeError("A run with --horizons or --cache_size cannot be resumed from a checkpoint")
     set_seed(seed)
     config_path = 'configs/tuned/moneat_ant.config'
-    config = neat.config.Config(neat.DefaultGenome, NSGA2Reproduction,
-                                neat.DefaultSpeciesSet, neat.DefaultStagnation, config_path)
+    config = select_species_set(neat.config.Config(neat.DefaultGenome, NSGA2Reproduction,
+                                                   neat.DefaultSpeciesSet, neat.DefaultStagnation, config_path))
     # Create the population, which is the top-level object for a NEAT run.
 
-    setup_wandb("moneat_evaluated_ant", ENV_ID, seed, config)
-    p = NSGA2Population(config)
+    # Metrics are logged from a background thread, offline runs write them to a local file
+    if offline:
+        sink = BufferedSink(JsonlSink(f"metrics-{ENV_ID}-{seed}.jsonl"))
+    else:
+        setup_wandb("moneat_evaluated_ant", ENV_ID, seed, config)
+        sink = BufferedSink(WandbSink())
+    front_plot = f"front-{ENV_ID}-{seed}.png"
+
+    if islands > 1:
+        # Independent populations in their own processes, exchanging front members every 10 generations
+        runner = IslandRunner(config, islands, migration_interval=10, seed=seed)
+        runner.add_reporter(MOReporter(ref_point=np.array([-100, -100]), sink=sink))
+        runner.run(eval_genomes, 600)
+        log_front(runner.objectives.front(), sink, offline, front_plot)
+        return
+
+    if resume is not None:
+        # Continue a preempted run, with the config and random state it was saved with
+        p = NSGA2Checkpointer.restore_checkpoint(resume)
+        config = p.config
+    else:
+        p = NSGA2Population(config)
+
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    p.add_reporter(NSGA2Checkpointer(p, generation_interval=10, time_interval_seconds=1800,
+                                     filename_prefix=os.path.join(checkpoint_dir, f"moneat-{ENV_ID}-{seed}-")))
 
     # Add a stdout reporter to show progress in the terminal.
-    p.add_reporter(MOReporter(ref_point=np.array([-100, -100])))
+    p.add_reporter(MOReporter(ref_point=np.array([-100, -100]), sink=sink))
     stats = neat.StatisticsReporter()
     p.add_reporter(stats)
+    # Phase times and evaluation throughput of every generation
+    p.add_reporter(ThroughputReporter(f"throughput-{ENV_ID}-{seed}.jsonl", sink=sink))
+
+    # Evaluate on the workers of a multi-node allocation, in local worker processes,
+    # each with its own environment, or in lockstep on the lanes of a vector environment.
+    # With resampling, genomes near the selection cut get extra episodes on the worker processes
+    if coordinator is not None:
+        evaluator = None
+        if authkey_file is None:
+            raise RuntimeError("The coordinator needs the authkey file of the run, see nsga2/distributed.py")
+        fitness_function = DistributedEvaluator(coordinator, read_authkey(authkey_file), timeout=600,
+                                                host=coordinator_host).evaluate
+    elif resample > 0:
+        evaluator = NSGA2ParallelEvaluator(workers, eval_genome, ENV_ID)
+        fitness_function = ResamplingEvaluator(p, evaluator, budget=resample).evaluate
+    elif lanes > 1 or horizons:
+        evaluator = LockstepEvaluator(ENV_ID, lanes, neat.nn.RecurrentNetwork,
+                                      asynchronous=workers > 1, action_function=clip_action, batched=True)
+        fitness_function = evaluator.evaluate
+    elif workers > 1:
+        evaluator = NSGA2ParallelEvaluator(workers, eval_genome, ENV_ID)
+        fitness_function = evaluator.evaluate
+    else:
+        evaluator = None
+        fitness_function = eval_genomes
+
+    # Start on truncated episodes and lengthen them whenever the hypervolume plateaus
+    if horizons:
+        if not isinstance(evaluator, LockstepEvaluator) or cache_size > 0:
+            raise RuntimeError("The horizon curriculum runs on the lockstep evaluator, without the evaluation cache")
+        curriculum = HorizonCurriculum(p, evaluator, horizons + [None], ref_point=np.array([-100, -100]),
+                                       sink=sink)
+        p.add_reporter(curriculum)
+        fitness_function = curriculum.evaluate
+
+    # Skip re-evaluating structurally identical genomes, only for deterministic environments
+    if cache_size > 0:
+        cache = CachedEvaluator(fitness_function, ENV_ID, seed, max_size=cache_size)
+        p.add_reporter(cache)
+        fitness_function = cache.evaluate
 
     # Run for up to 300 generations.
-    winners, non_dominant = p.run(eval_genomes, 600)
+    winners, non_dominant = p.run(fitness_function, 600 - p.generation)
+    if evaluator is not None:
+        evaluator.close()
 
-    # Print best 10 genomes as points in a 2d space with the objective values as coordinates using matplotlib
-    x = [g.fitness.values[0] for g in non_dominant]
-    y = [g.fitness.values[1] for g in non_dominant]
-    plt.scatter(y, x)
-    plt.xlabel("Time reward")
-    plt.ylabel("Treasure reward")
-    plt.title("MONEAT Pareto Front")
-
-
-
-    wandb.log({"final_front_plot": plt})
-    close_wandb()
-    #plt.show()
+    log_front(p.objectives.front(), sink, offline, front_plot)
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Run MONEAT with a specified seed.')
     parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--workers', type=int, default=1, help='Number of evaluation worker processes')
+    parser.add_argument('--lanes', type=int, default=1,
+                        help='Number of genomes evaluated in lockstep on a vector environment')
+    parser.add_argument('--cache_size', type=int, default=0,
+                        help='Size of the evaluation cache, only for deterministic environments (0 disables it)')
+    parser.add_argument('--checkpoint_dir', type=str, default='checkpoints', help='Directory for the checkpoints')
+    parser.add_argument('--resume', type=str, default=None, help='Checkpoint file to resume the run from')
+    parser.add_argument('--coordinator', type=int, default=None,
+                        help='Serve the evaluations on this port to workers started with nsga2/distributed.py')
+    parser.add_argument('--authkey_file', type=str, default=None,
+                        help='File with the secret authkey of a distributed run, written by nsga2/distributed.py')
+    parser.add_argument('--coordinator_host', type=str, default=None,
+                        help='Internal hostname to serve the evaluations on (this node by default)')
+    parser.add_argument('--horizons', type=int, nargs='+', default=None,
+                        help='Episode horizons of the curriculum, before the full episodes')
+    parser.add_argument('--resample', type=int, default=0,
+                        help='Extra episodes per generation for genomes near the selection cut (0 disables it)')
+    parser.add_argument('--islands', type=int, default=1,
+                        help='Number of island populations in separate processes (1 runs a single population)')
+    parser.add_argument('--offline', action='store_true',
+                        help='Write the metrics to a local file instead of wandb, without network access')
     args = parser.parse_args()
-    main(args.seed)
+    main(args.seed, args.workers, args.lanes, args.cache_size, args.checkpoint_dir, args.resume, args.coordinator,
+         args.horizons, args.resample, args.islands, args.offline, args.authkey_file, args.coordinator_host)
@@ -0,0 +1,279 @@
+"""
+Compiles the networks of many genomes into padded NumPy arrays, so that one
+forward step of all of them, for one or more observations each, is a handful
+of array operations instead of a Python loop over nodes and connections.
+"""
+import numpy as np
+
+from neat import activations, aggregations
+from neat.graphs import feed_forward_layers, required_for_output
+
+
+def _sigmoid(z):
+    z = np.clip(5.0 * z, -60.0, 60.0)
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+def _inv(z):
+    with np.errstate(divide='ignore', over='ignore'):
+        z = 1.0 / z
+    return np.where(np.isfinite(z), z, 0.0)
+
+
+def _softplus(z):
+    z = np.clip(5.0 * z, -60.0, 60.0)
+    return 0.2 * np.log(1 + np.exp(z))
+
+
+# NumPy versions of the built-in neat activation functions
+NUMPY_ACTIVATIONS = {
+    activations.sigmoid_activation: _sigmoid,
+    activations.tanh_activation: lambda z: np.tanh(np.clip(2.5 * z, -60.0, 60.0)),
+    activations.sin_activation: lambda z: np.sin(np.clip(5.0 * z, -60.0, 60.0)),
+    activations.gauss_activation: lambda z: np.exp(-5.0 * np.clip(z, -3.4, 3.4) ** 2),
+    activations.relu_activation: lambda z: np.where(z > 0.0, z, 0.0),
+    activations.softplus_activation: _softplus,
+    activations.identity_activation: lambda z: z,
+    activations.clamped_activation: lambda z: np.clip(z, -1.0, 1.0),
+    activations.inv_activation: _inv,
+    activations.log_activation: lambda z: np.log(np.maximum(1e-7, z)),
+    activations.exp_activation: lambda z: np.exp(np.clip(z, -60.0, 60.0)),
+    activations.abs_activation: np.abs,
+    activations.hat_activation: lambda z: np.maximum(0.0, 1 - np.abs(z)),
+    activations.square_activation: lambda z: z ** 2,
+    activations.cube_activation: lambda z: z ** 3,
+}
+
+
+def _reduce_sum(terms, valid):
+    # cumsum adds the links one after the other, like the sum() of neat
+    return np.cumsum(np.where(valid, terms, 0.0), axis=-1)[..., -1]
+
+
+def _reduce_product(terms, valid):
+    return np.cumprod(np.where(valid, terms, 1.0), axis=-1)[..., -1]
+
+
+def _reduce_max(terms, valid):
+    return np.max(np.where(valid, terms, -np.inf), axis=-1)
+
+
+def _reduce_min(terms, valid):
+    return np.min(np.where(valid, terms, np.inf), axis=-1)
+
+
+def _reduce_maxabs(terms, valid):
+    # First link with the largest magnitude, like max(x, key=abs)
+    first = np.argmax(np.where(valid, np.abs(terms), -1.0), axis=-1)
+    return np.take_along_axis(terms, first[..., None], axis=-1)[..., 0]
+
+
+def _reduce_mean(terms, valid):
+    count = np.maximum(valid.sum(axis=-1), 1)
+    return _reduce_sum(terms, valid) / count
+
+
+# NumPy versions of the built-in neat aggregation functions, reducing the last axis
+NUMPY_AGGREGATIONS = {
+    aggregations.sum_aggregation: _reduce_sum,
+    aggregations.product_aggregation: _reduce_product,
+    aggregations.max_aggregation: _reduce_max,
+    aggregations.min_aggregation: _reduce_min,
+    aggregations.maxabs_aggregation: _reduce_maxabs,
+    aggregations.mean_aggregation: _reduce_mean,
+}
+
+
+class _Stage(object):
+    """Node slots that are evaluated together, with their links gathered."""
+
+    def __init__(self, genome_rows, slots, sources, weights, valid, bias, response,
+                 activation_ids, activation_functions, aggregation_ids, aggregation_functions):
+        self.genome_rows = genome_rows
+        self.slots = slots
+        self.sources = sources
+        self.weights = weights
+        self.valid = valid
+        self.bias = bias
+        self.response = response
+        self.activations = [(f, np.flatnonzero(activation_ids == i)) for i, f in enumerate(activation_functions)]
+        self.activations = [(f, rows) for f, rows in self.activations if rows.size]
+        self.aggregations = [(f, np.flatnonzero(aggregation_ids == i)) for i, f in enumerate(aggregation_functions)]
+        self.aggregations = [(f, rows) for f, rows in self.aggregations if rows.size]
+
+    def evaluate(self, values):
+        """
+        New values of the stage's node slots, (P x B), computed from values (G x B x N).
+        """
+        b = np.arange(values.shape[1])[None, :, None]
+        terms = values[self.genome_rows[:, None, None], b, self.sources[:, None, :]] * self.weights[:, None, :]
+        valid = self.valid[:, None, :]
+
+        s = np.empty(terms.shape[:2])
+        for aggregate, rows in self.aggregations:
+            s[rows] = aggregate(terms[rows], valid[rows])
+        z = self.bias[:, None] + self.response[:, None] * s
+
+        out = np.empty(z.shape)
+        for activate, rows in self.activations:
+            out[rows] = activate(z[rows])
+        return out
+
+
+class BatchedNetwork(object):
+    """
+    The networks of G genomes as padded arrays over N node slots. Slots
+    [0, num_inputs) hold the inputs and the next num_outputs slots the
+    outputs, in the order of the genome config.
+
+    activate takes a (G x num_inputs) array, or (G x B x num_inputs) for B
+    observations per genome, and returns the outputs in the same layout.
+    Recurrent networks keep their state between calls, with one state per
+    observation, like neat.nn.RecurrentNetwork; reset clears it.
+
+    Recurrent networks are evaluated in one stage with all nodes reading the
+    previous values; feed-forward networks in one stage per layer, batched
+    over the genomes. The links of a node are combined in the order neat
+    combines them, so with float64 inputs the results match
+    neat.nn.FeedForwardNetwork and neat.nn.RecurrentNetwork up to the rounding
+    of the NumPy activation functions (identical for relu, clamped and the
+    other piecewise-linear ones).
+    """
+
+    def __init__(self, num_genomes, num_slots, num_inputs, num_outputs, stages, recurrent):
+        self.num_genomes = num_genomes
+        self.num_slots = num_slots
+        self.num_inputs = num_inputs
+        self.num_outputs = num_outputs
+        self.stages = stages
+        self.recurrent = recurrent
+        self.state = None
+
+    def __len__(self):
+        return self.num_genomes
+
+    def reset(self):
+        self.state = None
+
+    def activate(self, inputs):
+        inputs = np.asarray(inputs, dtype=np.float64)
+        if inputs.ndim not in (2, 3) or inputs.shape[0] != len(self) or inputs.shape[-1] != self.num_inputs:
+            raise RuntimeError("Expected {0:n} x {1:n} inputs, got {2}".format(
+                len(self), self.num_inputs, inputs.shape))
+        single = inputs.ndim == 2
+        if single:
+            inputs = inputs[:, None, :]
+
+        shape = (len(self), inputs.shape[1], self.num_slots)
+        if self.recurrent:
+            if self.state is None or self.state.shape != shape:
+                self.state = np.zeros(shape)
+            values = self.state
+            values[:, :, :self.num_inputs] = inputs
+            new = values.copy()
+            for stage in self.stages:
+                new[stage.genome_rows, :, stage.slots] = stage.evaluate(values)
+            self.state = values = new
+        else:
+            values = np.zeros(shape)
+            values[:, :, :self.num_inputs] = inputs
+            for stage in self.stages:
+                values[stage.genome_rows, :, stage.slots] = stage.evaluate(values)
+
+        outputs = values[:, :, self.num_inputs:self.num_inputs + self.num_outputs]
+        return outputs[:, 0, :] if single else outputs
+
+    @staticmethod
+    def create(genomes, config, recurrent=True):
+        """
+        Receives a list of genomes and returns their phenotypes as one
+        BatchedNetwork, with the structure of neat.nn.RecurrentNetwork or of
+        neat.nn.FeedForwardNetwork.
+        """
+        genome_config = config.genome_config
+        input_keys = list(genome_config.input_keys)
+        output_keys = list(genome_config.output_keys)
+
+        activation_functions = []
+        aggregation_functions = []
+        activation_index = {}
+        aggregation_index = {}
+        # One entry per evaluated node: (stage, genome row, slot, links, bias, response, activation, aggregation)
+        nodes = []
+        num_slots = len(input_keys) + len(output_keys)
+        for row, genome in enumerate(genomes):
+            if recurrent:
+                node_inputs, layers = _recurrent_structure(genome, input_keys, output_keys), None
+            else:
+                node_inputs, layers = _feed_forward_structure(genome, input_keys, output_keys)
+            slots = {key: i for i, key in enumerate(input_keys + output_keys)}
+            for node_key, links in node_inputs.items():
+                for key in [node_key] + [i for i, _ in links]:
+                    if key not in slots:
+                        slots[key] = len(slots)
+            num_slots = max(num_slots, len(slots))
+
+            for node_key, links in node_inputs.items():
+                node = genome.nodes[node_key]
+                activation = genome_config.activation_defs.get(node.activation)
+                if activation not in activation_index:
+                    activation_index[activation] = len(activation_functions)
+                    activation_functions.append(
+                        NUMPY_ACTIVATIONS.get(activation) or np.vectorize(activation, otypes=[np.float64]))
+                aggregation = genome_config.aggregation_function_defs.get(node.aggregation)
+                if aggregation not in aggregation_index:
+                    if aggregation not in NUMPY_AGGREGATIONS:
+                        raise RuntimeError("Aggregation {0!r} is not supported by BatchedNetwork".format(node.aggregation))
+                    aggregation_index[aggregation] = len(aggregation_functions)
+                    aggregation_functions.append(NUMPY_AGGREGATIONS[aggregation])
+                nodes.append((0 if layers is None else layers[node_key], row, slots[node_key],
+                              [(slots[i], w) for i, w in links], node.bias, node.response,
+                              activation_index[activation], aggregation_index[aggregation]))
+
+        stages = []
+        for stage in range(max([n[0] for n in nodes], default=-1) + 1):
+            members = [n for n in nodes if n[0] == stage]
+            k = max(len(n[3]) for n in members)
+            sources = np.zeros((len(members), k), dtype=np.intp)
+            weights = np.zeros((len(members), k))
+            valid = np.zeros((len(members), k), dtype=bool)
+            for j, n in enumerate(members):
+                for i, (source, weight) in enumerate(n[3]):
+                    sources[j, i] = source
+                    weights[j, i] = weight
+                    valid[j, i] = True
+            stages.append(_Stage(np.array([n[1] for n in members], dtype=np.intp),
+                                 np.array([n[2] for n in members], dtype=np.intp),
+                                 sources, weights, valid,
+                                 np.array([n[4] for n in members], dtype=np.float64),
+                                 np.array([n[5] for n in members], dtype=np.float64),
+                                 np.array([n[6] for n in members]), activation_functions,
+                                 np.array([n[7] for n in members]), aggregation_functions))
+
+        return BatchedNetwork(len(genomes), num_slots, len(input_keys), len(output_keys), stages, recurrent)
+
+
+def _recurrent_structure(genome, input_keys, output_keys):
+    # Same node and link selection as neat.nn.RecurrentNetwork.create
+    required = required_for_output(input_keys, output_keys, genome.connections)
+    node_inputs = {}
+    for cg in genome.connections.values():
+        if not cg.enabled:
+            continue
+        i, o = cg.key
+        if o not in required and i not in required:
+            continue
+        node_inputs.setdefault(o, []).append((i, cg.weight))
+    return node_inputs
+
+
+def _feed_forward_structure(genome, input_keys, output_keys):
+    # Same node and link selection as neat.nn.FeedForwardNetwork.create
+    connections = [cg.key for cg in genome.connections.values() if cg.enabled]
+    node_inputs = {}
+    layers = {}
+    for layer, nodes in enumerate(feed_forward_layers(input_keys, output_keys, connections)):
+        for node in nodes:
+            node_inputs[node] = [(i, genome.connections[(i, o)].weight) for i, o in connections if o == node]
+            layers[node] = layer
+    return node_inputs, layers
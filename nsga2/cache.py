@@ -0,0 +1,87 @@
+"""
+Caches the objective values of evaluated genomes under a hash of their
+structure, so that children that come out identical to an already evaluated
+genome are not evaluated again. Only valid for deterministic evaluations.
+"""
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+from neat.reporting import BaseReporter
+
+from .fitness import NSGA2Fitness
+
+
+def genome_hash(genome, env_id=None, seed=None):
+    """
+    Canonical hash of everything that determines the phenotype of a genome:
+    its nodes with their parameters and its enabled connections with their
+    weights, together with the environment ID and seed of the evaluation.
+    """
+    nodes = sorted((key, repr(n.bias), repr(n.response), n.activation, n.aggregation)
+                   for key, n in genome.nodes.items())
+    connections = sorted((key, repr(c.weight)) for key, c in genome.connections.items() if c.enabled)
+    description = repr((env_id, seed, nodes, connections))
+    return hashlib.blake2b(description.encode(), digest_size=16).digest()
+
+
+class CachedEvaluator(BaseReporter):
+    """
+    Wraps a fitness function and evaluates only the genomes whose hash is not
+    in the cache; the others get a fresh NSGA2Fitness with the cached values.
+    Genomes that share a hash within one call are evaluated once. The cache
+    keeps at most max_size entries and evicts the least recently used one.
+
+    Add the evaluator as a reporter to get the hits and misses of every
+    generation printed; they are kept in generation_stats as well.
+    """
+
+    def __init__(self, fitness_function, env_id=None, seed=None, max_size=10000):
+        self.fitness_function = fitness_function
+        self.env_id = env_id
+        self.seed = seed
+        self.max_size = max_size
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.generation_stats = []
+
+    def evaluate(self, genomes, config):
+        pending = OrderedDict()
+        for genome_id, genome in genomes:
+            key = genome_hash(genome, self.env_id, self.seed)
+            values = self.cache.get(key)
+            if values is not None:
+                self.cache.move_to_end(key)
+                genome.fitness = NSGA2Fitness(0.0, values.copy())
+                self.hits += 1
+            else:
+                pending.setdefault(key, []).append((genome_id, genome))
+
+        if pending:
+            self.fitness_function([duplicates[0] for duplicates in pending.values()], config)
+
+        for key, duplicates in pending.items():
+            evaluated = duplicates[0][1]
+            if evaluated.fitness is None:
+                raise RuntimeError("Fitness not assigned to genome {}".format(evaluated.key))
+            values = np.array(evaluated.fitness.values, dtype=np.float64)
+            for _, genome in duplicates[1:]:
+                genome.fitness = NSGA2Fitness(0.0, values.copy())
+            self.hits += len(duplicates) - 1
+            self.misses += 1
+
+            self.cache[key] = values
+            if len(self.cache) > self.max_size:
+                self.cache.popitem(last=False)
+
+    def start_generation(self, generation):
+        self.hits = 0
+        self.misses = 0
+
+    def post_evaluate(self, config, population, species, best_genome):
+        self.generation_stats.append((self.hits, self.misses))
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        print('Evaluation cache: {0:d} hits, {1:d} misses ({2:.1%} hit rate), {3:d} entries'.format(
+            self.hits, self.misses, rate, len(self.cache)))
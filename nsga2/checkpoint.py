@@ -0,0 +1,145 @@
+"""Saves and restores the full state of an NSGA2Population, including the NSGA-II parent state."""
+import ast
+import gzip
+import io
+import itertools
+import os
+import pickle
+import random
+import threading
+import time
+
+import numpy as np
+from neat.reporting import BaseReporter
+
+from .population import NSGA2Population
+
+# NSGA2Reproduction attributes that carry state from one generation to the next
+REPRODUCTION_STATE = ('genome_indexer', 'ancestors', 'parent_pop', 'parent_species', 'parent_store', 'parent_fronts')
+
+
+class _StatePickler(pickle.Pickler):
+    # itertools.count objects (genome, node and species indexers) are stored by
+    # their current value, which repr shows without advancing them.
+    def reducer_override(self, obj):
+        if type(obj) is itertools.count:
+            args = ast.literal_eval(repr(obj)[len('count'):])
+            return itertools.count, args if isinstance(args, tuple) else (args,)
+        return NotImplemented
+
+
+class NSGA2Checkpointer(BaseReporter):
+    """
+    A reporter that saves the state of an NSGA2Population at the end of a
+    generation, every generation_interval generations or
+    time_interval_seconds, whichever happens first.
+
+    The state is serialized in the generation loop, so it is a consistent
+    snapshot, and compressed and written by a background thread. Files are
+    written to a temporary name and renamed, so a preempted job never leaves
+    a truncated checkpoint behind.
+
+    The random and numpy random states are saved with the population. The
+    evaluators seed every episode from the numpy state (nsga2/seeding.py),
+    so the environments need no state of their own for a resumed run to
+    continue like an uninterrupted one.
+    """
+
+    def __init__(self, population, generation_interval=100, time_interval_seconds=300,
+                 filename_prefix='nsga2-checkpoint-'):
+        self.population = population
+        self.generation_interval = generation_interval
+        self.time_interval_seconds = time_interval_seconds
+        self.filename_prefix = filename_prefix
+
+        self.current_generation = None
+        self.last_generation_checkpoint = -1
+        self.last_time_checkpoint = time.time()
+        self.writer = None
+
+    def start_generation(self, generation):
+        self.current_generation = generation
+
+    def end_generation(self, config, population, species_set):
+        checkpoint_due = False
+
+        if self.time_interval_seconds is not None:
+            dt = time.time() - self.last_time_checkpoint
+            if dt >= self.time_interval_seconds:
+                checkpoint_due = True
+
+        if (checkpoint_due is False) and (self.generation_interval is not None):
+            dg = self.current_generation - self.last_generation_checkpoint
+            if dg >= self.generation_interval:
+                checkpoint_due = True
+
+        if checkpoint_due:
+            self.save_checkpoint()
+            self.last_generation_checkpoint = self.current_generation
+            self.last_time_checkpoint = time.time()
+
+    def found_solution(self, config, generation, best):
+        self.wait()
+
+    def wait(self):
+        """Block until the last checkpoint is on disk."""
+        if self.writer is not None:
+            self.writer.join()
+            self.writer = None
+
+    def save_checkpoint(self):
+        """ Save the current simulation state. """
+        p = self.population
+        # The population in the loop holds the children of the next generation
+        generation = p.generation + 1
+        species_set = {key: value for key, value in p.species.__dict__.items() if key != 'reporters'}
+        state = {
+            'generation': generation,
+            'config': p.config,
+            'population': p.population,
+            'species_set_type': type(p.species),
+            'species_set': species_set,
+            'reproduction': {key: getattr(p.reproduction, key) for key in REPRODUCTION_STATE},
+            'best_genome': p.best_genome,
+            'random_state': random.getstate(),
+            'numpy_random_state': np.random.get_state(),
+        }
+        buffer = io.BytesIO()
+        _StatePickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(state)
+
+        filename = '{0}{1}'.format(self.filename_prefix, generation)
+        print("Saving checkpoint to {0}".format(filename))
+        self.wait()
+        self.writer = threading.Thread(target=self._write, args=(filename, buffer.getvalue()))
+        self.writer.start()
+
+    @staticmethod
+    def _write(filename, data):
+        temporary = filename + '.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(gzip.compress(data, compresslevel=5))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, filename)
+
+    @staticmethod
+    def restore_checkpoint(filename):
+        """
+        Resumes the simulation from a previous saved point. Reporters are not
+        part of the checkpoint and have to be added again.
+        """
+        with gzip.open(filename) as f:
+            state = pickle.load(f)
+
+        species_set = state['species_set_type'].__new__(state['species_set_type'])
+        species_set.__dict__.update(state['species_set'])
+        p = NSGA2Population(state['config'], (state['population'], species_set, state['generation']))
+        species_set.reporters = p.reporters
+        for key, value in state['reproduction'].items():
+            setattr(p.reproduction, key, value)
+        p.best_genome = state['best_genome']
+        p.objectives = p.reproduction.parent_store
+
+        random.setstate(state['random_state'])
+        np.random.set_state(state['numpy_random_state'])
+        return p
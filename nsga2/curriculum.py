@@ -0,0 +1,100 @@
+"""
+Lengthens the evaluation horizon over the run: early generations are
+evaluated on truncated episodes, which already separate bad networks from
+promising ones, and the horizon grows whenever the hypervolume plateaus.
+"""
+from neat.reporting import BaseReporter
+
+from stats.performance_indicators import hypervolume
+
+
+class HorizonCurriculum(BaseReporter):
+    def __init__(self, population, evaluator, horizons, ref_point, patience=10, min_improvement=0.01,
+                 log_wandb=False, sink=None):
+        """
+        Evaluates with evaluator, e.g. a LockstepEvaluator or RacingEvaluator,
+        whose max_steps is set to the current horizon and whose steps counter
+        gives the environment steps it ran. horizons is the increasing
+        sequence of horizons; None as the last one means the time limit of the
+        environment.
+
+        The horizon moves on once the hypervolume of the parent front with
+        respect to ref_point did not improve by min_improvement (relative)
+        for patience generations. Fitness values of different horizons are
+        not comparable, so the surviving parents of population are evaluated
+        again together with the next children.
+
+        Add the curriculum as a reporter: it reads the parent front through
+        post_sort and reports the horizon and the cumulative environment
+        steps of every generation (kept in generation_stats as well).
+
+        The cumulative steps are also logged as env_steps_total to sink, one
+        of stats.sinks, or with log_wandb to wandb, uncommitted, so they go
+        out with the metrics MOReporter commits for the same generation and
+        can serve as its x-axis.
+        """
+        if not horizons:
+            raise RuntimeError("HorizonCurriculum needs at least one horizon")
+        self.population = population
+        self.evaluator = evaluator
+        self.horizons = list(horizons)
+        self.ref_point = ref_point
+        self.patience = patience
+        self.min_improvement = min_improvement
+        self.log_wandb = log_wandb
+        self.sink = sink
+
+        self.stage = 0
+        self.evaluator.max_steps = self.horizons[0]
+        self.reevaluate = False
+        self.best_hypervolume = None
+        self.stale_generations = 0
+        self.cur_hyper_volume = 0
+        self.steps = 0
+        self.generation_stats = []
+
+    @property
+    def horizon(self):
+        return self.horizons[self.stage]
+
+    def _describe_horizon(self):
+        return 'full episodes' if self.horizon is None else '{0} steps'.format(self.horizon)
+
+    def evaluate(self, genomes, config):
+        if self.reevaluate:
+            # The parents were ranked on the previous horizon
+            parents = list(self.population.reproduction.parent_pop.items())
+            genomes = parents + [(key, g) for key, g in genomes if key not in self.population.reproduction.parent_pop]
+            self.reevaluate = False
+
+        steps = self.evaluator.steps
+        self.evaluator.evaluate(genomes, config)
+        self.steps += self.evaluator.steps - steps
+
+    def post_sort(self, config, objectives):
+        self.cur_hyper_volume = hypervolume(self.ref_point, objectives.front())
+        # Before post_evaluate, where MOReporter commits the metrics of this generation
+        if self.sink is not None:
+            self.sink.log({'env_steps_total': self.steps}, commit=False)
+        elif self.log_wandb:
+            import wandb
+            wandb.log({'env_steps_total': self.steps}, commit=False)
+
+    def post_evaluate(self, config, population, species, best_genome):
+        self.generation_stats.append((self.horizon, self.steps))
+        print('Horizon: {0}, {1:d} environment steps in total'.format(self._describe_horizon(), self.steps))
+
+        if self.best_hypervolume is None or \
+                self.cur_hyper_volume > self.best_hypervolume + self.min_improvement * abs(self.best_hypervolume):
+            self.best_hypervolume = self.cur_hyper_volume
+            self.stale_generations = 0
+            return
+
+        self.stale_generations += 1
+        if self.stale_generations >= self.patience and self.stage + 1 < len(self.horizons):
+            self.stage += 1
+            self.evaluator.max_steps = self.horizon
+            self.reevaluate = True
+            self.best_hypervolume = None
+            self.stale_generations = 0
+            print('Hypervolume plateaued, horizon raised to {0}'.format(self._describe_horizon()))
@@ -0,0 +1,258 @@
+"""
+Evaluates genomes on worker processes on other hosts. The coordinator runs
+inside NSGA2Population.run and serves a task queue and a result queue with
+multiprocessing.managers over TCP; workers connect to it, take batches of
+genomes, evaluate them and send the objective values back.
+
+The manager exchanges pickles, so it only accepts connections with the
+secret authkey of the run. Create one per run in a file only its owner can
+read, and start workers, on any number of hosts, with:
+    python -m nsga2.distributed --new-authkey-file JOBDIR/authkey
+    python -m nsga2.distributed --connect HOST:PORT --authkey-file JOBDIR/authkey \
+        --function main:eval_genome --env-id mo-swimmer-v4
+"""
+import argparse
+import importlib
+import multiprocessing
+import os
+import queue
+import secrets
+import socket
+import sys
+import threading
+import time
+from itertools import count
+from multiprocessing.managers import BaseManager
+
+import numpy as np
+
+from .fitness import NSGA2Fitness
+from .instrumentation import counters
+from .seeding import episode_seeds, seed_env
+
+
+def write_authkey(path):
+    """
+    Write a new random authkey to path, readable by the owner only, and
+    return it. Fails if path exists.
+    """
+    authkey = secrets.token_hex(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(authkey + '\n')
+    return authkey
+
+
+def read_authkey(path):
+    """
+    Read the authkey written by write_authkey, refusing files that others
+    can read or write.
+    """
+    if os.stat(path).st_mode & 0o077:
+        raise RuntimeError("Authkey file {0} must only be accessible by its owner (chmod 600)".format(path))
+    with open(path) as f:
+        return f.read().strip()
+
+
+def _check_authkey(authkey):
+    if not authkey:
+        raise RuntimeError("A distributed run needs a secret authkey, see write_authkey")
+    return authkey.encode()
+
+
+def _manager_type():
+    # A fresh manager class per coordinator or worker, so their registrations don't mix
+    return type('QueueManager', (BaseManager,), {})
+
+
+class DistributedEvaluator(object):
+    def __init__(self, port, authkey, batch_size=1, timeout=None, host=None):
+        """
+        Serves the evaluation queues on host:port, by default on the hostname
+        of this node, which resolves to its address inside the allocation,
+        and only to clients with the secret authkey.
+        Genomes are sent in batches of batch_size, with seeds for their
+        episodes from the numpy random state. A batch that a worker took
+        but did not return within timeout seconds, e.g. because its host went
+        away, is put back into the queue for another worker; late results of
+        the first attempt are ignored, and workers skip the copies of
+        batches that are done. Workers send the environment steps and
+        activations they recorded back with the results.
+        """
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.tasks = queue.Queue()
+        self.results = queue.Queue()
+        self.task_ids = count()
+        # Tasks whose results are still wanted, workers drop the others
+        self.live = {}
+        self.requeued = 0
+
+        manager_type = _manager_type()
+        manager_type.register('get_tasks', callable=lambda: self.tasks)
+        manager_type.register('get_results', callable=lambda: self.results)
+        manager_type.register('get_live', callable=lambda: self.live)
+        host = socket.gethostname() if host is None else host
+        manager = manager_type(address=(host, port), authkey=_check_authkey(authkey))
+        self.server = manager.get_server()
+        self.address = self.server.address
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def evaluate(self, genomes, config):
+        # Copies of requeued batches of earlier generations are left over
+        self.live.clear()
+        while True:
+            try:
+                self.tasks.get_nowait()
+            except queue.Empty:
+                break
+        pending = {}
+        seeds = episode_seeds(len(genomes))
+        for start in range(0, len(genomes), self.batch_size):
+            batch = genomes[start:start + self.batch_size]
+            task_id = next(self.task_ids)
+            # A requeued batch keeps its episode seeds
+            pending[task_id] = (batch, seeds[start:start + self.batch_size])
+            self.live[task_id] = True
+            self.tasks.put((task_id, config) + pending[task_id])
+
+        # Deadlines start when a worker reports that it took a task
+        deadlines = {}
+        last_message = time.time()
+        while pending:
+            wait = self.timeout
+            if deadlines:
+                wait = max(0.0, min(deadlines.values()) - time.time())
+            try:
+                message, task_id, values = self.results.get(timeout=wait)
+                last_message = time.time()
+            except queue.Empty:
+                message = None
+
+            if message == 'started' and task_id in pending and self.timeout is not None:
+                deadlines[task_id] = time.time() + self.timeout
+            elif message == 'error' and task_id in pending:
+                raise RuntimeError("Evaluation of task {0} failed on a worker: {1}".format(task_id, values))
+            elif message == 'done' and task_id in pending:
+                values, work = values
+                for (genome_id, genome), v in zip(pending.pop(task_id)[0], values):
+                    genome.fitness = NSGA2Fitness(0.0, np.asarray(v, dtype=np.float64))
+                counters.record(**work)
+                self.live.pop(task_id, None)
+                deadlines.pop(task_id, None)
+
+            now = time.time()
+            expired = [t for t, deadline in deadlines.items() if deadline <= now]
+            if self.timeout is not None and self.tasks.empty() and now - last_message > self.timeout:
+                # Taken from the queue, but no worker reported it: the worker died on the way
+                expired += [t for t in pending if t not in deadlines]
+                last_message = now
+            for task_id in expired:
+                deadlines.pop(task_id, None)
+                self.tasks.put((task_id, config) + pending[task_id])
+                self.requeued += 1
+
+
+class DistributedWorker(object):
+    def __init__(self, host, port, eval_function, authkey, env_id=None,
+                 retry_interval=1.0, poll_interval=0.05, give_up_after=60.0):
+        """
+        Evaluates tasks of the coordinator at host:port. eval_function takes
+        (genome, config, env) like for NSGA2ParallelEvaluator, or (genome,
+        config) without an env_id. The worker reconnects whenever the
+        connection drops and stops once it could not reach the coordinator for
+        give_up_after seconds, e.g. because the run is over.
+        """
+        self.address = (host, port)
+        self.authkey = _check_authkey(authkey)
+        self.eval_function = eval_function
+        self.env_id = env_id
+        self.retry_interval = retry_interval
+        self.poll_interval = poll_interval
+        self.give_up_after = give_up_after
+        self.env = None
+
+    def evaluate(self, genome, config, seed):
+        if self.env_id is None:
+            return self.eval_function(genome, config)
+        if self.env is None:
+            import mo_gymnasium
+            self.env = mo_gymnasium.make(self.env_id)
+        seed_env(self.env, seed)
+        return self.eval_function(genome, config, self.env)
+
+    def run(self):
+        manager_type = _manager_type()
+        manager_type.register('get_tasks')
+        manager_type.register('get_results')
+        manager_type.register('get_live')
+        last_contact = time.time()
+        while time.time() - last_contact < self.give_up_after:
+            try:
+                manager = manager_type(address=self.address, authkey=self.authkey)
+                manager.connect()
+                tasks = manager.get_tasks()
+                results = manager.get_results()
+                live = manager.get_live()
+                while True:
+                    # Polling keeps a dead worker from leaving a blocked get behind on the server
+                    try:
+                        task_id, config, batch, seeds = tasks.get_nowait()
+                    except queue.Empty:
+                        last_contact = time.time()
+                        time.sleep(self.poll_interval)
+                        continue
+                    last_contact = time.time()
+                    if not live.get(task_id, False):
+                        # Another worker already returned this batch
+                        continue
+                    results.put(('started', task_id, None))
+                    work = counters.snapshot()
+                    try:
+                        values = [list(map(float, self.evaluate(genome, config, seed)))
+                                  for (_, genome), seed in zip(batch, seeds)]
+                    except Exception as e:
+                        results.put(('error', task_id, repr(e)))
+                    else:
+                        results.put(('done', task_id, (values, counters.since(work))))
+            except (ConnectionError, EOFError, OSError):
+                time.sleep(self.retry_interval)
+
+
+def _run_worker(host, port, function, env_id, authkey):
+    module_name, name = function.split(':')
+    eval_function = getattr(importlib.import_module(module_name), name)
+    DistributedWorker(host, port, eval_function, authkey, env_id).run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run evaluation workers for a distributed MONEAT run.')
+    parser.add_argument('--new-authkey-file', type=str, default=None,
+                        help='Only write a new authkey for a run to this file and exit')
+    parser.add_argument('--connect', type=str, help='Address of the coordinator, HOST:PORT')
+    parser.add_argument('--authkey-file', type=str, help='File with the authkey of the run')
+    parser.add_argument('--function', type=str, help='Evaluation function, MODULE:NAME')
+    parser.add_argument('--env-id', type=str, default=None, help='mo-gymnasium environment of every worker')
+    parser.add_argument('--processes', type=int, default=1, help='Number of worker processes on this host')
+    args = parser.parse_args()
+
+    if args.new_authkey_file is not None:
+        write_authkey(args.new_authkey_file)
+        return
+    if args.connect is None or args.function is None or args.authkey_file is None:
+        parser.error('--connect, --authkey-file and --function are required to run workers')
+
+    authkey = read_authkey(args.authkey_file)
+    host, port = args.connect.rsplit(':', 1)
+    # Make the evaluation function importable from the working directory
+    sys.path.insert(0, os.getcwd())
+    worker_args = (host, int(port), args.function, args.env_id, authkey)
+    processes = [multiprocessing.Process(target=_run_worker, args=worker_args) for _ in range(args.processes)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+
+
+if __name__ == '__main__':
+    main()
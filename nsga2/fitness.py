@@ -1,16 +1,77 @@
 import numpy as np
 
+# Rank of genomes that were left out of a truncated (lazy) non-dominated sort.
+# Ranks count down from 0 for the first front, so this compares below all of them.
+UNRANKED = float('-inf')
+
 class NSGA2Fitness(float):
+    """
+    Per-genome fitness of NSGA-II. The float value is what neat-python sees,
+    the objective values, rank and crowding distance are kept in slots.
+
+    sort_key is the crowded-comparison key (rank, crowding_dist), rebuilt
+    whenever one of them is assigned, so sorts can use a plain tuple key
+    instead of rich comparisons. The mean of the values is cached as well and
+    dropped when values is assigned; values must be reassigned, not mutated
+    in place, for the cache to follow.
+
+    estimated is set when the values are a conservative estimate instead of
+    the result of a complete evaluation, e.g. for an episode cut short by
+    racing.
+
+    episodes is the number of episodes the values are the mean of, and
+    std_error their standard error per objective, None for a single episode.
+    """
+
+    __slots__ = ('_rank', '_crowding_dist', '_values', '_mean', 'sort_key', 'estimated', 'episodes', 'std_error')
 
     def __new__(cls, value, *args, **kwargs):
         return super(NSGA2Fitness, cls).__new__(cls, value)
     
     def __init__(self, value, values) -> None:
         super().__init__()
-        self.rank = 0
-        self.crowding_dist = 0
-        self.values = values
-    
+        self._rank = 0
+        self._crowding_dist = 0
+        self._values = values
+        self._mean = None
+        self.sort_key = (0, 0)
+        self.estimated = False
+        self.episodes = 1
+        self.std_error = None
+
+    @property
+    def rank(self):
+        return self._rank
+
+    @rank.setter
+    def rank(self, rank):
+        self._rank = rank
+        self.sort_key = (rank, self._crowding_dist)
+
+    @property
+    def crowding_dist(self):
+        return self._crowding_dist
+
+    @crowding_dist.setter
+    def crowding_dist(self, crowding_dist):
+        self._crowding_dist = crowding_dist
+        self.sort_key = (self._rank, crowding_dist)
+
+    @property
+    def values(self):
+        return self._values
+
+    @values.setter
+    def values(self, values):
+        self._values = values
+        self._mean = None
+
+    @property
+    def mean(self):
+        if self._mean is None:
+            self._mean = float(np.mean(self._values))
+        return self._mean
+
     def dominates(self, other) -> bool:
         dominates = False
         for a,b in zip(self.values, other.values):
@@ -23,21 +84,13 @@ class NSGA2Fitness(float):
     def __gt__(self, value) -> bool:
         # Use crowded comparison operator
         if isinstance(value, NSGA2Fitness):
-            if self.rank > value.rank:
-                return True
-            elif self.rank == value.rank:
-                return self.crowding_dist > value.crowding_dist
-            return False
-        return np.mean(self.values) > value
+            return self.sort_key > value.sort_key
+        return self.mean > value
     
     def __lt__(self, value) -> bool:
         if isinstance(value, NSGA2Fitness):
-            if self.rank < value.rank:
-                return True
-            elif self.rank == value.rank:
-                return self.crowding_dist < value.crowding_dist
-            return False
-        return np.mean(self.values) < value
+            return self.sort_key < value.sort_key
+        return self.mean < value
         
     def __str__(self) -> str:
         return f"Rank: {self.rank}, Crowding Distance: {self.crowding_dist}, Values: {self.values}"
@@ -0,0 +1,38 @@
+"""
+Counters of the evaluation work done in this process, read by
+NSGA2Population.run to report the throughput of every generation.
+
+Evaluators that run episodes call record; NSGA2ParallelEvaluator sends the
+counts of its worker processes back along with the objective values.
+"""
+import threading
+
+COUNTS = ('steps', 'activations')
+
+
+class EvaluationCounters(object):
+    def __init__(self):
+        self.steps = 0
+        self.activations = 0
+        self._lock = threading.Lock()
+
+    def record(self, steps=0, activations=0):
+        # Results of the pool come in on its result thread
+        with self._lock:
+            self.steps += steps
+            self.activations += activations
+
+    def snapshot(self):
+        return {name: getattr(self, name) for name in COUNTS}
+
+    def since(self, snapshot):
+        """Counts recorded since snapshot was taken."""
+        return {name: getattr(self, name) - snapshot[name] for name in COUNTS}
+
+
+counters = EvaluationCounters()
+
+
+def record(steps=0, activations=0):
+    """Count environment steps and network activations of an evaluation."""
+    counters.record(steps, activations)
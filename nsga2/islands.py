@@ -0,0 +1,224 @@
+"""
+Island model: several independent NSGA2Populations, each in its own
+process, that exchange members of their non-dominated fronts every few
+generations. Sorting, reproduction and speciation of the islands run in
+parallel, not only the evaluation.
+"""
+import multiprocessing
+import random
+import traceback
+from itertools import count
+
+import numpy as np
+
+from .fitness import UNRANKED
+from .population import NSGA2Population
+from .reporting import NSGA2ReporterSet
+from .sorting import crowding_distance, iter_non_dominated_fronts, objective_matrix
+from .store import ObjectiveStore
+
+
+def migration_sources(topology, num_islands):
+    """
+    For every island the list of islands it receives immigrants from: its
+    predecessor on a ring, or all other islands when fully connected.
+    """
+    if topology == 'ring':
+        return [[(i - 1) % num_islands] for i in range(num_islands)]
+    if topology == 'full':
+        return [[j for j in range(num_islands) if j != i] for i in range(num_islands)]
+    raise RuntimeError("Unexpected migration topology: {0!r}".format(topology))
+
+
+def _localize_nodes(genome_config, genomes):
+    """
+    Give the hidden nodes of genomes from another island fresh keys from the
+    node_indexer of this island, so they cannot collide with the nodes this
+    island created under the same keys, and rewrite the connections that
+    reference them. Genomes from the same island share their node keys, so
+    the same key gets the same new key in all of them; input and output keys
+    are the same on every island and are kept.
+    """
+    if genome_config.node_indexer is None:
+        # No hidden node was created on this island yet
+        genome_config.node_indexer = count(max(genome_config.output_keys) + 1)
+    fixed = set(genome_config.input_keys) | set(genome_config.output_keys)
+    keys = {}
+    for genome in genomes:
+        for key in genome.nodes:
+            if key not in fixed and key not in keys:
+                keys[key] = next(genome_config.node_indexer)
+
+        nodes = {}
+        for key, node in genome.nodes.items():
+            node.key = keys.get(key, key)
+            nodes[node.key] = node
+        genome.nodes = nodes
+        connections = {}
+        for (i, o), connection in genome.connections.items():
+            connection.key = (keys.get(i, i), keys.get(o, o))
+            connections[connection.key] = connection
+        genome.connections = connections
+
+
+def settle(population, immigrants):
+    """
+    Add immigrants to the next generation of an NSGA2Population. immigrants
+    holds one list of genomes per island they come from; their hidden nodes
+    get keys of this island and the genomes new keys from its
+    genome_indexer, they are evaluated again with the children and the
+    population is respeciated.
+    """
+    genome_config = population.config.genome_config
+    for genomes in immigrants:
+        _localize_nodes(genome_config, genomes)
+        for genome in genomes:
+            genome.key = next(population.reproduction.genome_indexer)
+            genome.fitness = None
+            population.population[genome.key] = genome
+            population.reproduction.ancestors[genome.key] = tuple()
+    population.species.speciate(population.config, population.population, population.generation)
+
+
+def _run_island(index, config, fitness_function, n, migration_interval, migrants, seed,
+                inbox, targets, num_sources, reports):
+    try:
+        if seed is not None:
+            random.seed(seed + index)
+            np.random.seed(seed + index)
+        p = NSGA2Population(config)
+        done = 0
+        while done < n:
+            k = min(migration_interval, n - done)
+            p.run(fitness_function, k)
+            done += k
+
+            parents = p.reproduction.parent_pop
+            front = [parents[key] for key in p.objectives.front_keys()]
+            species = {sid: len(s.members) for sid, s in p.species.species.items()}
+            reports.put(('report', index, p.generation - 1, parents, [g.key for g in front], species))
+            if done >= n:
+                break
+
+            # The most isolated members of the front leave for the neighbours
+            emigrants = sorted(front, key=lambda g: g.fitness.crowding_dist, reverse=True)[:migrants]
+            for target in targets:
+                target.put(emigrants)
+            settle(p, [inbox.get() for _ in range(num_sources)])
+    except Exception:
+        reports.put(('error', index, traceback.format_exc()))
+
+
+class IslandRunner(object):
+    def __init__(self, config, num_islands, migration_interval=10, migrants=None, topology='ring', seed=None):
+        """
+        Runs num_islands NSGA2Populations of config in separate processes.
+        Every migration_interval generations each island sends up to migrants
+        (pop_size // 10 by default) members of its non-dominated front, the
+        ones with the largest crowding distance, to the islands it is
+        connected to by topology ('ring' or 'full'), and waits for the
+        immigrants of its own sources.
+
+        At every migration the islands report back, and the reporters added
+        to the runner see one merged generation: post_sort gets an
+        ObjectiveStore of the parents of all islands, keyed by (island, key),
+        in which only the global non-dominated front is ranked, and
+        post_evaluate and end_generation get the merged parents. species.species
+        of end_generation maps (island, species id) to the number of members,
+        enough for reporters that look at the front, like MOReporter.
+        """
+        if not config.no_fitness_termination:
+            raise RuntimeError("Islands run for a fixed number of generations, set no_fitness_termination")
+        self.config = config
+        self.num_islands = num_islands
+        self.migration_interval = migration_interval
+        self.migrants = migrants if migrants is not None else max(1, config.pop_size // 10)
+        self.sources = migration_sources(topology, num_islands)
+        self.seed = seed
+        self.reporters = NSGA2ReporterSet()
+        self.objectives = None
+        self.population = None
+        self.best_genome = None
+        self.non_dominated = []
+
+    def add_reporter(self, reporter):
+        self.reporters.add(reporter)
+
+    def remove_reporter(self, reporter):
+        self.reporters.remove(reporter)
+
+    def run(self, fitness_function, n):
+        """
+        Runs every island for n generations. fitness_function is called in
+        the island processes, so it has to be picklable. Returns the best
+        genome and the members of the merged non-dominated front.
+        """
+        inboxes = [multiprocessing.Queue() for _ in range(self.num_islands)]
+        targets = [[] for _ in range(self.num_islands)]
+        for i, sources in enumerate(self.sources):
+            for j in sources:
+                targets[j].append(inboxes[i])
+        reports = multiprocessing.Queue()
+
+        processes = []
+        for i in range(self.num_islands):
+            args = (i, self.config, fitness_function, n, self.migration_interval, self.migrants, self.seed,
+                    inboxes[i], targets[i], len(self.sources[i]), reports)
+            processes.append(multiprocessing.Process(target=_run_island, args=args, daemon=True))
+        for process in processes:
+            process.start()
+
+        try:
+            for _ in range(-(-n // self.migration_interval)):
+                islands = {}
+                while len(islands) < self.num_islands:
+                    message = reports.get()
+                    if message[0] == 'error':
+                        raise RuntimeError("Island {0} failed:\n{1}".format(message[1], message[2]))
+                    islands[message[1]] = message[2:]
+                self._report(islands)
+        finally:
+            for process in processes:
+                process.join(timeout=1.0)
+                if process.is_alive():
+                    process.terminate()
+
+        return self.best_genome, self.non_dominated
+
+    def _report(self, islands):
+        generation = max(report[0] for report in islands.values())
+        population = {}
+        front_keys = []
+        species_set = _IslandSpecies()
+        for i, (_, parents, front, species) in sorted(islands.items()):
+            population.update(((i, key), g) for key, g in parents.items())
+            front_keys.extend((i, key) for key in front)
+            species_set.species.update(((i, sid), size) for sid, size in species.items())
+
+        # Every global non-dominated genome is on the front of its island
+        front_objectives = objective_matrix({key: population[key] for key in front_keys})
+        first = next(iter_non_dominated_fronts(front_objectives))
+        self.non_dominated = [population[front_keys[i]] for i in first]
+        distances = crowding_distance(front_objectives[first], np.zeros(len(first), dtype=np.intp))
+
+        self.population = population
+        self.objectives = ObjectiveStore.from_genomes(population)
+        self.objectives.rank[:] = UNRANKED
+        rows = self.objectives.rows([front_keys[i] for i in first])
+        self.objectives.rank[rows] = 0
+        self.objectives.crowding[rows] = distances
+        for genome, d in zip(self.non_dominated, distances.tolist()):
+            genome.fitness.rank = 0
+            genome.fitness.crowding_dist = d
+        self.best_genome = self.non_dominated[int(np.argmax(distances))]
+
+        self.reporters.start_generation(generation)
+        self.reporters.post_sort(self.config, self.objectives)
+        self.reporters.post_evaluate(self.config, population, species_set, self.best_genome)
+        self.reporters.end_generation(self.config, population, species_set)
+
+
+class _IslandSpecies(object):
+    # The species of all islands, as far as front-level reporters look at them
+    def __init__(self):
+        self.species = {}
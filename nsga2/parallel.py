@@ -0,0 +1,101 @@
+"""
+Runs evaluation functions in parallel subprocesses, like neat.ParallelEvaluator,
+but for multi-objective evaluation functions that return a vector of objective
+values per genome.
+"""
+from multiprocessing import Pool
+
+import numpy as np
+
+from .fitness import NSGA2Fitness
+from .instrumentation import counters
+from .seeding import episode_seeds, seed_env
+
+# Environment of the current worker process, created on its first evaluation
+_env_id = None
+_env_kwargs = {}
+_env = None
+
+
+def _init_worker(env_id, env_kwargs):
+    global _env_id, _env_kwargs
+    _env_id = env_id
+    _env_kwargs = env_kwargs
+
+
+def _get_env():
+    global _env
+    if _env is None:
+        import mo_gymnasium
+        _env = mo_gymnasium.make(_env_id, **_env_kwargs)
+    return _env
+
+
+def _evaluate(eval_function, genome, config, seed):
+    # The counts recorded in the worker go back with the values
+    work = counters.snapshot()
+    if _env_id is None:
+        values = eval_function(genome, config)
+    else:
+        env = _get_env()
+        seed_env(env, seed)
+        values = eval_function(genome, config, env)
+    return values, counters.since(work)
+
+
+def _collect(result):
+    values, work = result
+    counters.record(**work)
+    return np.asarray(values, dtype=np.float64)
+
+
+class NSGA2ParallelEvaluator(object):
+    def __init__(self, num_workers, eval_function, env_id=None, timeout=None, env_kwargs=None):
+        """
+        eval_function should take the arguments (genome object, config object,
+        environment) and return the objective values of the genome as a
+        sequence of floats. Every worker process lazily creates its own
+        mo-gymnasium environment env_id and reuses it for all the genomes it
+        evaluates. Every episode is seeded from the numpy random state of
+        the calling process, see nsga2/seeding.py. Without an env_id,
+        eval_function is called with only (genome, config).
+
+        eval_function has to be picklable, i.e. defined at module level.
+        """
+        self.num_workers = num_workers
+        self.eval_function = eval_function
+        self.timeout = timeout
+        self.pool = Pool(num_workers, initializer=_init_worker, initargs=(env_id, env_kwargs or {}))
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def submit(self, genome, config, callback, error_callback=None):
+        """
+        Evaluate one genome asynchronously. callback is called with the
+        objective values from the result thread of the pool once they are in.
+        """
+        self.pool.apply_async(_evaluate, (self.eval_function, genome, config, episode_seeds(1)[0]),
+                              callback=lambda result: callback(_collect(result)), error_callback=error_callback)
+
+    def run_episodes(self, genomes, config):
+        """
+        Evaluate every genome of the list once, all at the same time, and
+        return their objective values without assigning a fitness. A genome
+        may appear several times to get several episodes of it.
+        """
+        jobs = []
+        for (ignored_genome_id, genome), seed in zip(genomes, episode_seeds(len(genomes))):
+            jobs.append(self.pool.apply_async(_evaluate, (self.eval_function, genome, config, seed)))
+        return [_collect(job.get(timeout=self.timeout)) for job in jobs]
+
+    def evaluate(self, genomes, config):
+        # assign the objective values back to each genome
+        for (ignored_genome_id, genome), values in zip(genomes, self.run_episodes(genomes, config)):
+            genome.fitness = NSGA2Fitness(0.0, values)
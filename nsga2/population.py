@@ -1,5 +1,9 @@
+import time
+
 from neat.math_util import mean
-from neat.reporting import ReporterSet
+
+from .instrumentation import counters
+from .reporting import NSGA2ReporterSet
 
 
 class CompleteExtinctionException(Exception):
@@ -17,7 +21,7 @@ class NSGA2Population(object):
     """
 
     def __init__(self, config, initial_state=None):
-        self.reporters = ReporterSet()
+        self.reporters = NSGA2ReporterSet()
         self.config = config
         stagnation = config.stagnation_type(config.stagnation_config, self.reporters)
         self.reproduction = config.reproduction_type(config.reproduction_config,
@@ -45,6 +49,8 @@ class NSGA2Population(object):
             self.population, self.species, self.generation = initial_state
 
         self.best_genome = None
+        # ObjectiveStore of the current parents, set by every sort
+        self.objectives = None
 
     def add_reporter(self, reporter):
         self.reporters.add(reporter)
@@ -70,6 +76,11 @@ class NSGA2Population(object):
         It is assumed that fitness_function does not modify the list of genomes,
         the genomes themselves (apart from updating the fitness member),
         or the configuration object.
+
+        After every generation the reporters get a generation_timing event
+        with the seconds spent evaluating, sorting, reproducing and
+        speciating, the number of genomes handed to fitness_function and the
+        environment steps and network activations its evaluators recorded.
         """
 
         if self.config.no_fitness_termination and (n is None):
@@ -82,14 +93,23 @@ class NSGA2Population(object):
             self.reporters.start_generation(self.generation)
 
             # Evaluate all genomes using the user-provided function.
+            # Each phase is timed, and the work of the evaluation counted.
+            timing = {'genomes': len(self.population)}
+            start = time.perf_counter()
+            work = counters.snapshot()
             fitness_function(list(self.population.items()), self.config)
+            timing['evaluate'] = time.perf_counter() - start
+            timing.update(counters.since(work))
 
             # Sort population using nsga2
+            start = time.perf_counter()
             self.population = self.reproduction.sort(self.species, self.generation, self.config.pop_size)
+            timing['sort'] = time.perf_counter() - start
 
-            valus = self.population.values()
+            self.objectives = self.reproduction.parent_store
+            self.reporters.post_sort(self.config, self.objectives)
 
-            self.non_dominated = {g for g in self.population.values() if g.fitness.rank == 0}
+            self.non_dominated = {self.population[key] for key in self.objectives.front_keys()}
 
             # Gather and report statistics.
             best = None
@@ -97,13 +117,13 @@ class NSGA2Population(object):
                 if g.fitness is None:
                     raise RuntimeError("Fitness not assigned to genome {}".format(g.key))
 
-                if best is None or g.fitness > best.fitness:
+                if best is None or g.fitness.sort_key > best.fitness.sort_key:
                     best = g
             self.reporters.post_evaluate(self.config, self.population, self.species, best)
 
 
             # Track the best genome ever seen.
-            if self.best_genome is None or best.fitness > self.best_genome.fitness:
+            if self.best_genome is None or best.fitness.sort_key > self.best_genome.fitness.sort_key:
                 self.best_genome = best
 
            
@@ -112,12 +132,15 @@ class NSGA2Population(object):
                 # End if the fitness threshold is reached.
                 fv = self.fitness_criterion(g.fitness for g in self.population.values())
                 if fv >= self.config.fitness_threshold:
+                    self.reporters.generation_timing(self.config, self.generation, timing)
                     self.reporters.found_solution(self.config, self.generation, best)
                     break
 
             # Create the next generation from the current generation.
+            start = time.perf_counter()
             self.population = self.reproduction.reproduce(self.config, self.species,
                                                           self.config.pop_size, self.generation)
+            timing['reproduce'] = time.perf_counter() - start
 
             # Check for complete extinction.
             if not self.species.species:
@@ -133,8 +156,11 @@ class NSGA2Population(object):
                     raise CompleteExtinctionException()
 
             # Divide the new population into species.
+            start = time.perf_counter()
             self.species.speciate(self.config, self.population, self.generation)
+            timing['speciate'] = time.perf_counter() - start
 
+            self.reporters.generation_timing(self.config, self.generation, timing)
             self.reporters.end_generation(self.config, self.population, self.species)
 
             self.generation += 1
@@ -0,0 +1,124 @@
+"""
+Races episodes against the current parent front: an episode is cut as soon as
+even the best possible remainder of it cannot bring the genome onto the front.
+"""
+import neat
+import numpy as np
+from neat.reporting import BaseReporter
+
+from .fitness import NSGA2Fitness
+from .instrumentation import record
+from .seeding import episode_seeds, seed_env
+
+
+def is_dominated(front, point):
+    """True if some point of the front dominates point (maximisation)."""
+    return bool(np.any(np.all(front >= point, axis=1) & np.any(front > point, axis=1)))
+
+
+def race_episode(env, policy, front, reward_low, reward_high, max_steps, check_interval=10):
+    """
+    Run one episode of policy on env, cutting it once it can no longer reach
+    the front.
+
+    reward_low and reward_high bound the vector reward of a single step. Every
+    check_interval steps the optimistic return, i.e. the partial return plus
+    the remaining steps at reward_high, is compared with the front. Since the
+    episode can also end early, only positive bounds are added. If the
+    optimistic return is dominated the episode stops and the pessimistic
+    return, with the remaining steps at reward_low, is returned as a
+    conservative estimate.
+
+    Returns the (estimated) return, the number of steps run and whether the
+    episode was cut.
+    """
+    gain = np.maximum(reward_high, 0.0)
+    loss = np.minimum(reward_low, 0.0)
+    observation, info = env.reset()
+    total = np.zeros(len(gain))
+    for step in range(1, max_steps + 1):
+        observation, vector_reward, terminated, truncated, info = env.step(policy(observation))
+        total += vector_reward
+        if terminated or truncated:
+            return total, step, False
+        if front is not None and len(front) and step % check_interval == 0:
+            remaining = max_steps - step
+            if is_dominated(front, total + remaining * gain):
+                return total + remaining * loss, step, True
+    return total, max_steps, False
+
+
+class RacingEvaluator(BaseReporter):
+    def __init__(self, env_id, reward_low, reward_high, network_type=neat.nn.RecurrentNetwork,
+                 action_function=None, max_steps=None, check_interval=10, env_kwargs=None):
+        """
+        Evaluates genomes one after the other on env_id, racing every episode
+        against the non-dominated front of the parents. reward_low and
+        reward_high are the per-step bounds of the vector reward. max_steps
+        defaults to the time limit of the environment.
+
+        Add the evaluator as a reporter: it receives the parent front through
+        post_sort and reports the episodes cut and the environment steps
+        saved in every generation (kept in generation_stats as well). Genomes
+        of cut episodes get a fitness with estimated set.
+        """
+        self.env_id = env_id
+        self.reward_low = np.asarray(reward_low, dtype=np.float64)
+        self.reward_high = np.asarray(reward_high, dtype=np.float64)
+        self.network_type = network_type
+        self.action_function = action_function
+        self.max_steps = max_steps
+        self.check_interval = check_interval
+        self.env_kwargs = env_kwargs or {}
+        self.env = None
+        self.front = None
+        self.episodes = 0
+        self.cut = 0
+        self.steps = 0
+        self.steps_saved = 0
+        self.generation_stats = []
+
+    def evaluate(self, genomes, config):
+        if self.env is None:
+            import mo_gymnasium
+            self.env = mo_gymnasium.make(self.env_id, **self.env_kwargs)
+        max_steps = self.max_steps
+        if max_steps is None:
+            if self.env.spec is None or self.env.spec.max_episode_steps is None:
+                raise RuntimeError("Racing needs max_steps for {0!r}, it has no time limit".format(self.env_id))
+            max_steps = self.env.spec.max_episode_steps
+
+        for (genome_id, genome), seed in zip(genomes, episode_seeds(len(genomes))):
+            seed_env(self.env, seed)
+            net = self.network_type.create(genome, config)
+            if self.action_function is None:
+                policy = net.activate
+            else:
+                policy = lambda observation: self.action_function(net.activate(observation))
+            values, steps, cut = race_episode(self.env, policy, self.front, self.reward_low, self.reward_high,
+                                              max_steps, self.check_interval)
+            genome.fitness = NSGA2Fitness(0.0, values)
+            genome.fitness.estimated = cut
+
+            self.episodes += 1
+            self.steps += steps
+            record(steps=steps, activations=steps)
+            if cut:
+                self.cut += 1
+                self.steps_saved += max_steps - steps
+
+    def post_sort(self, config, objectives):
+        self.front = objectives.front().copy()
+
+    def start_generation(self, generation):
+        self.episodes = 0
+        self.cut = 0
+        self.steps = 0
+        self.steps_saved = 0
+
+    def post_evaluate(self, config, population, species, best_genome):
+        self.generation_stats.append((self.episodes, self.cut, self.steps, self.steps_saved))
+        total = self.steps + self.steps_saved
+        saved = self.steps_saved / total if total else 0.0
+        print('Racing: {0:d} of {1:d} episodes cut, {2:d} environment steps saved ({3:.1%})'.format(
+            self.cut, self.episodes, self.steps_saved, saved))
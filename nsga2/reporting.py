@@ -0,0 +1,19 @@
+from neat.reporting import ReporterSet
+
+
+class NSGA2ReporterSet(ReporterSet):
+    """
+    ReporterSet with the extra events of NSGA2Population. Reporters only
+    receive an extra event if they define a method for it, so plain neat
+    reporters can be mixed in.
+    """
+
+    def post_sort(self, config, objectives):
+        for r in self.reporters:
+            if hasattr(r, 'post_sort'):
+                r.post_sort(config, objectives)
+
+    def generation_timing(self, config, generation, timing):
+        for r in self.reporters:
+            if hasattr(r, 'generation_timing'):
+                r.generation_timing(config, generation, timing)
@@ -1,8 +1,14 @@
 from neat.config import ConfigParameter, DefaultClassConfig
 from itertools import count
 from neat.species import Species
+from .sorting import (objective_matrix, vectorized_non_dominated_sort, sweep_non_dominated_sort,
+                      best_order_sort, select_sort_algorithm, iter_non_dominated_fronts,
+                      IncrementalFronts, crowding_distance)
+from .fitness import UNRANKED
+from .store import ObjectiveStore
 import math
 import random
+import numpy as np
 
 class NSGA2Reproduction:
     
@@ -14,7 +20,9 @@ class NSGA2Reproduction:
         return DefaultClassConfig(param_dict,
                                   [ConfigParameter('elitism', int, 0),
                                    ConfigParameter('survival_threshold', float, 0.2),
-                                   ConfigParameter('min_species_size', int, 1)])
+                                   ConfigParameter('min_species_size', int, 1),
+                                   ConfigParameter('sort_backend', str, 'auto'),
+                                   ConfigParameter('lazy_sort', bool, False)])
 
 
     def __init__(self, config, reporters, stagnation) -> None:
@@ -31,6 +39,22 @@ class NSGA2Reproduction:
         self.fronts = []
         self.parent_pop = {}
         self.parent_species = {}
+        # Objective store of the surviving parents, aligned with parent_pop
+        self.parent_store = None
+        # Front structure of the surviving parents, kept by the incremental sort backend
+        self.parent_fronts = None
+
+        sort_backends = {
+            'python': self.fast_non_dominated_sort,
+            'numpy': self.vectorized_non_dominated_sort,
+            'sweep': self.sweep_non_dominated_sort,
+            'best_order': self.best_order_sort,
+            'auto': self.auto_non_dominated_sort,
+            'incremental': self.incremental_non_dominated_sort,
+        }
+        if config.sort_backend not in sort_backends:
+            raise RuntimeError("Unexpected sort_backend: {0!r}".format(config.sort_backend))
+        self.non_dominated_sort = sort_backends[config.sort_backend]
 
     """
     Create num_genomes new genomes of the given type using the given configuration.
@@ -49,7 +73,8 @@ class NSGA2Reproduction:
 
         return new_genomes
     
-    def fast_non_dominated_sort(self, population):
+    def fast_non_dominated_sort(self, population, objectives=None):
+        # objectives is accepted for symmetry with the other backends, this sort reads the fitness objects
         F = {}
         S = {}
         n = {}
@@ -91,30 +116,158 @@ class NSGA2Reproduction:
             i += 1
             F[i] = Q
         return F
+
+    def vectorized_non_dominated_sort(self, population, objectives=None):
+        """
+        Drop-in replacement for fast_non_dominated_sort that computes the
+        dominance relation with NumPy. Returns the same fronts and ranks.
+        """
+        return self._sort_with(vectorized_non_dominated_sort, population, objectives)
+
+    def sweep_non_dominated_sort(self, population, objectives=None):
+        """
+        O(N log N) sort for two objectives. Fronts and ranks are the same as
+        fast_non_dominated_sort, members of a front are in population order.
+        """
+        return self._sort_with(sweep_non_dominated_sort, population, objectives)
+
+    def best_order_sort(self, population, objectives=None):
+        """
+        Best Order Sort for any number of objectives, using O(M N) memory.
+        Fronts and ranks are the same as fast_non_dominated_sort, members of
+        a front are in population order.
+        """
+        return self._sort_with(best_order_sort, population, objectives)
+
+    def auto_non_dominated_sort(self, population, objectives=None):
+        """
+        Pick the sorting algorithm from the population size and the number of
+        objectives: the sweep for two objectives, otherwise the dominance
+        matrix for small populations and Best Order Sort for large ones.
+        """
+        if objectives is None:
+            objectives = objective_matrix(population)
+        algorithm = select_sort_algorithm(*objectives.shape)
+        return self._sort_with(algorithm, population, objectives)
+
+    def incremental_non_dominated_sort(self, population, objectives=None):
+        """
+        Reuse the front structure of the surviving parents and only insert the
+        new children into it. Falls back to a full sort when the parents
+        changed since the last generation (e.g. after a re-evaluation).
+        Fronts and ranks are the same as fast_non_dominated_sort, members of
+        a front are in population order.
+        """
+        if objectives is None:
+            objectives = objective_matrix(population)
+        position = {key: i for i, key in enumerate(population.keys())}
+
+        fronts = self.parent_fronts
+        if fronts is not None:
+            parents = fronts.members()
+            if (any(key not in position for key in parents) or
+                    not np.array_equal(fronts.objectives(), objectives[[position[key] for key in parents]])):
+                fronts = None
+
+        if fronts is None:
+            fronts = IncrementalFronts.from_objectives(list(position.keys()), objectives)
+        else:
+            members = set(parents)
+            for key, i in position.items():
+                if key not in members:
+                    fronts.insert(key, objectives[i])
+        self.parent_fronts = fronts
+
+        F = {}
+        for i, keys in enumerate(fronts.keys):
+            F[i] = sorted(keys, key=position.__getitem__)
+            for key in F[i]:
+                population[key].fitness.rank = -i
+        F[len(F)] = []
+        return F
+
+    def _sort_with(self, algorithm, population, objectives=None):
+        if objectives is None:
+            objectives = objective_matrix(population)
+        keys = list(population.keys())
+        F = {}
+        for i, front in enumerate(algorithm(objectives)):
+            F[i] = [keys[j] for j in front]
+            for key in F[i]:
+                population[key].fitness.rank = -i
+        return F
+
+    def lazy_non_dominated_sort(self, population, objectives=None):
+        """
+        Yield the fronts of the population one at a time, ranking each front
+        only when it is requested. Genomes of fronts that are never requested
+        keep whatever rank they had, so callers that stop early have to mark
+        them as UNRANKED.
+        """
+        if objectives is None:
+            objectives = objective_matrix(population)
+        keys = list(population.keys())
+        for i, front in enumerate(iter_non_dominated_fronts(objectives)):
+            front = [keys[j] for j in front]
+            for key in front:
+                population[key].fitness.rank = -i
+            yield front
     
     def assing_crowding_distance(self, front, population):
         if len(front) == 0:
             return
         
-        distances = [0] * len(front)
+        # Distances are kept per genome, since the front is re-sorted for every objective
+        distances = {f: 0 for f in front}
         nobj = len(population[front[0]].fitness.values)
 
         for m in range(nobj):
             front.sort(key=lambda x: population[x].fitness.values[m])
-            distances[0] = float('inf')
-            distances[-1] = float('inf')
+            distances[front[0]] = float('inf')
+            distances[front[-1]] = float('inf')
             max_val = population[front[-1]].fitness.values[m]
             min_val = population[front[0]].fitness.values[m]
             if max_val == min_val:
                 continue
             scale = max_val - min_val
             for i in range(1, len(front)-1):
-                distances[i] += (population[front[i + 1]].fitness.values[m] - population[front[i - 1]].fitness.values[m])/scale
+                distances[front[i]] += (population[front[i + 1]].fitness.values[m] - population[front[i - 1]].fitness.values[m])/scale
 
 
-        for i, f in enumerate(front):
-            population[f].fitness.crowding_dist = distances[i]
-            
+        for f in front:
+            population[f].fitness.crowding_dist = distances[f]
+
+    def assign_crowding_distances(self, fronts, population, store=None):
+        """
+        Vectorized assing_crowding_distance for several fronts at once. The
+        objective rows are taken from the store (or gathered once without one)
+        and all distances are computed in a single call. Each front is left in
+        the same order the per-front version leaves it in. With a store, the
+        ranks and distances are recorded in it as well.
+        """
+        keys = [key for front in fronts for key in front]
+        if not keys:
+            return
+        front_ids = np.repeat(np.arange(len(fronts)), [len(front) for front in fronts])
+        if store is None:
+            objectives = objective_matrix({key: population[key] for key in keys})
+        else:
+            rows = store.rows(keys)
+            objectives = store.objectives[rows]
+        distances = crowding_distance(objectives, front_ids)
+        for key, d in zip(keys, distances.tolist()):
+            population[key].fitness.crowding_dist = d
+        if store is not None:
+            store.rank[rows] = -front_ids
+            store.crowding[rows] = distances
+
+        # Sorted by the last objective, ties broken by the earlier ones
+        order = np.lexsort((np.arange(len(keys)),) + tuple(objectives.T) + (front_ids,))
+        start = 0
+        for front in fronts:
+            front[:] = [keys[i] for i in order[start:start + len(front)]]
+            start += len(front)
+
     
     def sort(self, species, generation, pop_size):
         # Filter out stagnated species, collect the set of non-stagnated species members
@@ -159,35 +312,64 @@ class NSGA2Reproduction:
             else:
                 species.species[id] = sp
 
-        F = self.fast_non_dominated_sort(population)
+        # Parent rows are reused from the last generation, only the children are gathered
+        store = ObjectiveStore.from_genomes(population, reuse=self.parent_store)
 
-        self.parent_pop = {}
-        i = 0
-        while len(self.parent_pop) + len(F[i]) <= pop_size:
-            self.assing_crowding_distance(F[i], population)
-            for p in F[i]:
-                self.parent_pop[p] = population[p]
-            if len(self.parent_pop) == pop_size:
+        if self.reproduction_config.lazy_sort:
+            # Fronts are ranked on demand and peeling stops once pop_size survivors are selected
+            fronts = self.lazy_non_dominated_sort(population, store.objectives)
+        else:
+            F = self.non_dominated_sort(population, store.objectives)
+            fronts = (F[i] for i in range(len(F)))
+
+        # Collect the fronts needed to fill pop_size
+        admitted = []
+        ranked = set()
+        for front in fronts:
+            admitted.append(front)
+            ranked.update(front)
+            if len(ranked) >= pop_size:
                 break  # Stop if we have reached the required population size
-            i += 1
+        fronts.close()
 
+        # Backends differ in the order within a front, and ties in crowding distance
+        # are broken by that order, so every front is put in population order first
+        position = {key: i for i, key in enumerate(population)}
+        for front in admitted:
+            front.sort(key=position.__getitem__)
+        self.assign_crowding_distances(admitted, population, store)
 
-        # If adding the next front exceeds pop_size, fill the remaining slots based on crowding distance
-        if len(self.parent_pop) < pop_size:
-            self.assing_crowding_distance(F[i], population)
-            # Sort the individuals in the current front by their crowding distance in descending order
-            F[i].sort(key=lambda x: population[x].fitness.crowding_dist, reverse=True)
-            remaining_slots = pop_size - len(self.parent_pop)
-            for p in F[i][:remaining_slots]:
+        self.parent_pop = {}
+        for front in admitted:
+            if len(self.parent_pop) + len(front) > pop_size:
+                # If adding the next front exceeds pop_size, fill the remaining slots based on crowding distance
+                # Sort the individuals in the current front by their crowding distance in descending order
+                front.sort(key=lambda x: population[x].fitness.crowding_dist, reverse=True)
+                remaining_slots = pop_size - len(self.parent_pop)
+                for p in front[:remaining_slots]:
+                    self.parent_pop[p] = population[p]
+                break
+            for p in front:
                 self.parent_pop[p] = population[p]
 
+        if self.parent_fronts is not None:
+            # Survivors keep their mutual front structure for the next generation
+            self.parent_fronts.retain(self.parent_pop)
+
+        if self.reproduction_config.lazy_sort:
+            # Genomes of fronts that were never peeled get an explicit marker instead of a stale rank
+            for key, g in population.items():
+                if key not in ranked:
+                    g.fitness.rank = UNRANKED
+
         # Sort population by rank and crowding distance
-        new_pop = sorted(self.parent_pop.values(), key=lambda x: x.fitness, reverse=True)
+        new_pop = sorted(self.parent_pop.values(), key=lambda x: x.fitness.sort_key, reverse=True)
 
         #for i, g in enumerate(new_pop):
         #    print(f"Genome {i} has rank {g.fitness.rank} and crowding distance {g.fitness.crowding_dist} and values {g.fitness.values}")
 
         pop_dict = {g.key:g for g in new_pop}
+        self.parent_store = store.subset(list(pop_dict.keys()))
 
         ## NSGA-II : post step 2 : Clean Species
         # Remove the genomes that haven't passed the crowding-distance step
@@ -223,7 +405,7 @@ class NSGA2Reproduction:
         for _, sp in species.species.items():
             # Sort species members by crowd distance
             members = list(sp.members.values())
-            members.sort(key=lambda g: g.fitness, reverse=True)
+            members.sort(key=lambda g: g.fitness.sort_key, reverse=True)
             #for i, g in enumerate(members):
             #    print(f"Genome {i} has rank {g.fitness.rank} and crowding distance {g.fitness.crowding_dist} and values {g.fitness.values}")
             # Survival threshold: how many members should be used as parents
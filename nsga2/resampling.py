@@ -0,0 +1,118 @@
+"""
+Multi-episode evaluation for stochastic environments that spends extra
+episodes only where they can change the selection: on the genomes around the
+cut that NSGA2Reproduction.sort makes between survivors and the rest.
+"""
+import numpy as np
+
+from .fitness import NSGA2Fitness
+from .sorting import crowding_distance, iter_non_dominated_fronts
+
+
+def add_episodes(fitness, returns):
+    """
+    A new NSGA2Fitness with the mean and standard error of the episodes
+    behind fitness together with the (k x m) episode returns, merged with
+    the pairwise update of Chan et al. fitness may be None.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    n_b = len(returns)
+    mean_b = returns.mean(axis=0)
+    m2_b = ((returns - mean_b) ** 2).sum(axis=0)
+    if fitness is None:
+        n, mean, m2 = n_b, mean_b, m2_b
+    else:
+        n_a = fitness.episodes
+        mean_a = np.asarray(fitness.values, dtype=np.float64)
+        # The sum of squares is recovered from the standard error of the sample variance
+        m2_a = 0.0 if fitness.std_error is None else fitness.std_error ** 2 * n_a * (n_a - 1)
+        n = n_a + n_b
+        delta = mean_b - mean_a
+        mean = mean_a + delta * n_b / n
+        m2 = m2_a + m2_b + delta ** 2 * n_a * n_b / n
+
+    new = NSGA2Fitness(0.0, mean)
+    new.episodes = n
+    if n > 1:
+        new.std_error = np.sqrt(m2 / (n - 1) / n)
+    return new
+
+
+def selection_boundary(objectives, pop_size):
+    """
+    Row indices around the survivor cut of NSGA-II selection among the rows
+    of objectives, nearest to the cut first.
+
+    The last admitted front, and the next one if the last is admitted as a
+    whole, are each ordered by decreasing crowding distance, as sort fills
+    the remaining slots. The rows are ordered by their distance to the cut
+    in this sequence. Empty if there is no cut.
+    """
+    if len(objectives) <= pop_size:
+        return np.zeros(0, dtype=np.intp)
+    admitted = 0
+    near = []
+    for front in iter_non_dominated_fronts(objectives):
+        if admitted + len(front) >= pop_size or near:
+            distances = crowding_distance(objectives[front], np.zeros(len(front), dtype=np.intp))
+            near.append(front[np.argsort(-distances, kind='stable')])
+            if admitted + len(front) > pop_size or len(near) == 2:
+                break
+        if not near:
+            admitted += len(front)
+    sequence = np.concatenate(near)
+    cut = pop_size - admitted
+    # Slots cut - 1 (last in) and cut (first out) are equally near
+    order = np.argsort(np.abs(np.arange(len(sequence)) - cut + 0.5), kind='stable')
+    return sequence[order]
+
+
+class ResamplingEvaluator(object):
+    def __init__(self, population, runner, base_episodes=1, budget=None, max_episodes=10, round_size=None):
+        """
+        Evaluates every new genome with base_episodes episodes, then spends
+        up to budget extra episodes per generation (as many as there are new
+        genomes by default) on the genomes nearest to the selection cut among
+        them and the surviving parents of population. Extra episodes are run
+        in rounds of round_size (the number of workers by default), after
+        each of which the cut is located again; no genome gets more than
+        max_episodes in total.
+
+        runner is an NSGA2ParallelEvaluator; every round is one batch of
+        episodes over its workers. Fitness values are the mean returns, with
+        episodes and std_error set on the fitness. Parents keep their
+        episodes, so their estimates get better the longer they survive.
+        """
+        self.population = population
+        self.runner = runner
+        self.base_episodes = base_episodes
+        self.budget = budget
+        self.max_episodes = max_episodes
+        self.round_size = round_size if round_size is not None else runner.num_workers
+
+    def _run(self, genomes, config):
+        # One batch of episodes over the pool, merged into the fitness of every genome
+        returns = {}
+        for (key, genome), values in zip(genomes, self.runner.run_episodes(genomes, config)):
+            returns.setdefault(key, (genome, []))[1].append(values)
+        for genome, values in returns.values():
+            genome.fitness = add_episodes(genome.fitness, values)
+
+    def evaluate(self, genomes, config):
+        for _, genome in genomes:
+            genome.fitness = None
+        self._run([item for item in genomes for _ in range(self.base_episodes)], config)
+
+        candidates = dict(self.population.reproduction.parent_pop)
+        candidates.update(genomes)
+        keys = list(candidates.keys())
+        budget = len(genomes) if self.budget is None else self.budget
+        while budget > 0:
+            objectives = np.array([candidates[key].fitness.values for key in keys], dtype=np.float64)
+            chosen = [keys[i] for i in selection_boundary(objectives, config.pop_size)
+                      if candidates[keys[i]].fitness.episodes < self.max_episodes]
+            chosen = chosen[:min(self.round_size, budget)]
+            if not chosen:
+                break
+            self._run([(key, candidates[key]) for key in chosen], config)
+            budget -= len(chosen)
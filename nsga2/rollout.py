@@ -0,0 +1,167 @@
+"""
+Evaluates several genomes in lockstep on a gymnasium vector environment. Each
+lane of the vector environment runs the episode of one genome, all lanes are
+stepped with one call and the objective vectors are accumulated per lane.
+"""
+import gymnasium
+import neat
+import numpy as np
+
+from .batched import BatchedNetwork
+from .fitness import NSGA2Fitness
+from .instrumentation import record
+from .seeding import episode_seeds
+
+
+class VectorRewardInfo(gymnasium.Wrapper):
+    """
+    Moves the vector reward of a mo-gymnasium environment into
+    info['vector_reward'] and returns a scalar reward of 0 instead, since the
+    gymnasium vector environments store one float reward per lane.
+    """
+
+    def __init__(self, env):
+        super().__init__(env)
+        self.reward_space = env.unwrapped.reward_space
+
+    def step(self, action):
+        observation, vector_reward, terminated, truncated, info = self.env.step(action)
+        info = dict(info)
+        info['vector_reward'] = np.asarray(vector_reward, dtype=np.float64)
+        return observation, 0.0, terminated, truncated, info
+
+
+def make_vector_env(env_id, num_envs, asynchronous=False, **env_kwargs):
+    """
+    Create a vector environment of num_envs copies of the mo-gymnasium
+    environment env_id, synchronous or with one subprocess per copy.
+    """
+    def make_env():
+        import mo_gymnasium
+        return VectorRewardInfo(mo_gymnasium.make(env_id, **env_kwargs))
+
+    env_fns = [make_env] * num_envs
+    if asynchronous:
+        return gymnasium.vector.AsyncVectorEnv(env_fns)
+    return gymnasium.vector.SyncVectorEnv(env_fns)
+
+
+def _lane_rewards(infos, i):
+    # With the same-step autoreset of gymnasium 0.29 the info of a finished
+    # lane is the reset info, the info of its last step is in final_info.
+    if 'final_info' in infos and infos['_final_info'][i]:
+        return infos['final_info'][i]['vector_reward']
+    return infos['vector_reward'][i]
+
+
+def network_policy(networks, action_function=None):
+    """
+    Build a lockstep policy from one neat network per lane. The policy maps the
+    (K x obs_dim) observations and the mask of lanes still running to the
+    (K x action_dim) actions, activating only the running networks.
+    """
+    def policy(observations, active, actions):
+        for i in np.flatnonzero(active):
+            output = networks[i].activate(observations[i])
+            actions[i] = output if action_function is None else action_function(output)
+        return actions
+    return policy
+
+
+def batched_policy(network, action_function=None):
+    """
+    Build a lockstep policy from a BatchedNetwork with one genome per lane.
+    All genomes are activated with one call; action_function maps the
+    (K x num_outputs) outputs to the actions.
+    """
+    def policy(observations, active, actions):
+        outputs = network.activate(observations[:len(network)])
+        actions[:len(network)] = outputs if action_function is None else action_function(outputs)
+        return actions
+    return policy
+
+
+def lockstep_rollout(vector_env, policy, num_lanes, reward_dim, max_steps=None, seeds=None):
+    """
+    Run one episode on each of the first num_lanes lanes of vector_env.
+
+    policy(observations, active, actions) fills the actions of the active
+    lanes in place and returns them; lanes that finished, or are beyond
+    num_lanes, are stepped with a zero action and their results ignored.
+    seeds, one per environment, seed the reset of the lanes.
+    Returns the (num_lanes x reward_dim) accumulated vector rewards and the
+    episode length of every lane.
+    """
+    num_envs = vector_env.num_envs
+    if num_lanes > num_envs:
+        raise RuntimeError("Cannot run {0} lanes on {1} environments".format(num_lanes, num_envs))
+
+    action_space = vector_env.single_action_space
+    idle_action = np.zeros(action_space.shape, dtype=action_space.dtype)
+
+    returns = np.zeros((num_envs, reward_dim))
+    lengths = np.zeros(num_envs, dtype=np.int64)
+    active = np.zeros(num_envs, dtype=bool)
+    active[:num_lanes] = True
+
+    observations, _ = vector_env.reset(seed=seeds)
+    while active.any() and (max_steps is None or lengths.max() < max_steps):
+        actions = np.broadcast_to(idle_action, (num_envs,) + idle_action.shape).copy()
+        actions = policy(observations, active, actions)
+        observations, _, terminated, truncated, infos = vector_env.step(actions)
+
+        for i in np.flatnonzero(active):
+            returns[i] += _lane_rewards(infos, i)
+        lengths[active] += 1
+        active &= ~(terminated | truncated)
+
+    return returns[:num_lanes], lengths[:num_lanes]
+
+
+class LockstepEvaluator(object):
+    def __init__(self, env_id, num_envs, network_type=neat.nn.FeedForwardNetwork,
+                 asynchronous=False, action_function=None, max_steps=None, env_kwargs=None, batched=False):
+        """
+        Evaluates the genomes in batches of num_envs, one genome per lane of a
+        vector environment of env_id. action_function maps the network output
+        of one lane to its action, e.g. to clip it to the action space.
+        evaluate is a drop-in fitness_function for NSGA2Population.run.
+
+        With batched, the networks of a batch are compiled into one
+        BatchedNetwork with the structure of network_type, and
+        action_function is applied to the outputs of all lanes at once.
+
+        The lanes of every batch are seeded from the numpy random state,
+        see nsga2/seeding.py. steps counts the environment steps of all
+        evaluated episodes.
+        """
+        self.network_type = network_type
+        self.batched = batched
+        self.action_function = action_function
+        self.max_steps = max_steps
+        self.steps = 0
+        self.vector_env = make_vector_env(env_id, num_envs, asynchronous, **(env_kwargs or {}))
+        # The reward space is not part of the vector env, ask one copy
+        self.reward_dim = self.vector_env.get_attr('reward_space')[0].shape[0]
+
+    def close(self):
+        self.vector_env.close()
+
+    def evaluate(self, genomes, config):
+        num_envs = self.vector_env.num_envs
+        for start in range(0, len(genomes), num_envs):
+            batch = genomes[start:start + num_envs]
+            if self.batched:
+                network = BatchedNetwork.create([genome for _, genome in batch], config,
+                                                recurrent=self.network_type is not neat.nn.FeedForwardNetwork)
+                policy = batched_policy(network, self.action_function)
+            else:
+                networks = [self.network_type.create(genome, config) for _, genome in batch]
+                policy = network_policy(networks, self.action_function)
+            returns, lengths = lockstep_rollout(self.vector_env, policy, len(batch), self.reward_dim,
+                                                self.max_steps, episode_seeds(num_envs))
+            self.steps += int(lengths.sum())
+            # One activation per lane and step
+            record(steps=int(lengths.sum()), activations=int(lengths.sum()))
+            for (_, genome), values in zip(batch, returns):
+                genome.fitness = NSGA2Fitness(0.0, values)
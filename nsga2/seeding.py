@@ -0,0 +1,21 @@
+"""
+Seeds for the episodes of an evaluation. They are drawn from the global numpy
+random state of the process that runs the generation loop, which
+NSGA2Checkpointer saves, so a resumed run plays the same episodes as an
+uninterrupted one, no matter which process or lane runs an episode.
+"""
+import numpy as np
+from gymnasium.utils import seeding
+
+
+def episode_seeds(n):
+    """n seeds for the next episodes, from the global numpy random state."""
+    return np.random.randint(0, 2 ** 31 - 1, size=n).tolist()
+
+
+def seed_env(env, seed):
+    """
+    Seed the random generator of env like env.reset(seed=seed) does, without
+    resetting it, so the next plain env.reset() starts the seeded episode.
+    """
+    env.unwrapped.np_random, _ = seeding.np_random(seed)
@@ -0,0 +1,355 @@
+import numpy as np
+
+
+def objective_matrix(population):
+    """
+    Gather the objective values of a population into one (N x M) float64 matrix.
+
+    Rows follow the iteration order of the population dict, so row i belongs
+    to the i-th key of the dict.
+    """
+    rows = []
+    for g in population.values():
+        if g.fitness is None:
+            raise RuntimeError("Fitness not assigned to genome {}".format(g.key))
+        rows.append(g.fitness.values)
+    return np.asarray(rows, dtype=np.float64)
+
+
+def dominance_matrix(objectives):
+    """
+    Compute the full dominance relation of a set of points (maximisation).
+
+    D[i, j] is True if point i dominates point j, i.e. it is at least as good in
+    every objective and strictly better in at least one.
+    """
+    a = objectives[:, None, :]
+    b = objectives[None, :, :]
+    return np.all(a >= b, axis=2) & np.any(a > b, axis=2)
+
+
+def vectorized_non_dominated_sort(objectives):
+    """
+    Sort the rows of an objective matrix into non-dominated fronts.
+
+    This is the same algorithm as NSGA2Reproduction.fast_non_dominated_sort,
+    but the dominance relation is built once with broadcast comparisons and
+    the fronts are peeled off with array operations. The returned fronts hold
+    row indices in the same order the pure Python version produces them, and
+    like the Python version the last front is always empty.
+    """
+    dominates = dominance_matrix(objectives)
+    n = dominates.sum(axis=0)
+    front = np.flatnonzero(n == 0)
+    fronts = []
+    while front.size:
+        fronts.append(front)
+        sub = dominates[front]
+        n = n - sub.sum(axis=0)
+        candidates = np.flatnonzero((n == 0) & sub.any(axis=0))
+        # The Python version appends q while walking the current front in order,
+        # i.e. when its last dominator in that front has been processed.
+        last = len(front) - 1 - np.argmax(sub[::-1, candidates], axis=0)
+        front = candidates[np.lexsort((candidates, last))]
+    fronts.append(front)
+    return fronts
+
+
+def sweep_non_dominated_sort(objectives):
+    """
+    Sort the rows of a two-objective matrix into non-dominated fronts in
+    O(N log N).
+
+    Points are swept in decreasing lexicographic order, so every dominator of a
+    point is visited before it. Inside a front the most recently added point has
+    the largest second objective, so it is the only member that has to be
+    checked, and whether it dominates the current point is monotone over the
+    fronts, which allows a binary search for the first free front.
+    """
+    if objectives.shape[1] != 2:
+        raise RuntimeError("The sweep sort needs exactly 2 objectives, got {0}".format(objectives.shape[1]))
+    order = np.lexsort((-objectives[:, 1], -objectives[:, 0]))
+    fronts = []
+    last = []
+    for i, (f0, f1) in zip(order.tolist(), objectives[order].tolist()):
+        lo, hi = 0, len(fronts)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            l0, l1 = last[mid]
+            if l1 > f1 or (l1 == f1 and l0 > f0):
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == len(fronts):
+            fronts.append([i])
+            last.append((f0, f1))
+        else:
+            fronts[lo].append(i)
+            last[lo] = (f0, f1)
+    return _finish_fronts(fronts)
+
+
+class _FrontBuffer:
+    """Growable block of objective rows belonging to one front."""
+
+    def __init__(self, m):
+        self.rows = np.empty((8, m))
+        self.size = 0
+
+    def append(self, row):
+        if self.size == len(self.rows):
+            self.rows = np.concatenate([self.rows, np.empty_like(self.rows)])
+        self.rows[self.size] = row
+        self.size += 1
+
+    def dominates(self, row):
+        rows = self.rows[:self.size]
+        return bool(np.any(np.all(rows >= row, axis=1) & np.any(rows > row, axis=1)))
+
+
+def best_order_sort(objectives):
+    """
+    Sort the rows of an objective matrix into non-dominated fronts with
+    Best Order Sort (Roy, Islam and Deb, 2016).
+
+    Each objective gets its own sorted order, with ties broken by the other
+    objectives so that dominators always come first. The orders are walked in
+    lockstep and a point is ranked the first time it is met, by comparing it
+    only against the points that preceded it in that order. Memory is O(M N),
+    and the number of comparisons is O(M N log N) in the best case and
+    O(M N^2) in the worst case.
+    """
+    n, m = objectives.shape
+    orders = []
+    for j in range(m):
+        keys = [-objectives[:, k] for k in reversed(range(m)) if k != j]
+        orders.append(np.lexsort(keys + [-objectives[:, j]]).tolist())
+
+    rank = [-1] * n
+    fronts = []
+    seen = [[] for _ in range(m)]
+    ranked = 0
+    for i in range(n):
+        for j in range(m):
+            s = orders[j][i]
+            row = objectives[s]
+            buffers = seen[j]
+            k = rank[s]
+            if k < 0:
+                lo, hi = 0, len(buffers)
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    if buffers[mid].dominates(row):
+                        lo = mid + 1
+                    else:
+                        hi = mid
+                k = rank[s] = lo
+                if k == len(fronts):
+                    fronts.append([])
+                fronts[k].append(s)
+                ranked += 1
+            while len(buffers) <= k:
+                buffers.append(_FrontBuffer(m))
+            buffers[k].append(row)
+        if ranked == n:
+            break
+    return _finish_fronts(fronts)
+
+
+def _finish_fronts(fronts):
+    # Members are returned in population order, followed by the empty front
+    # that terminates the Python and NumPy sorts.
+    fronts = [np.sort(np.asarray(f, dtype=np.intp)) for f in fronts]
+    fronts.append(np.empty(0, dtype=np.intp))
+    return fronts
+
+
+# Population size from which Best Order Sort beats the O(N^2) dominance matrix
+# for three or more objectives, measured with benchmarks/sorting_benchmark.py.
+# For two objectives the sweep is faster at every population size.
+BEST_ORDER_MIN_SIZE = 1000
+
+
+def select_sort_algorithm(n, m):
+    """
+    Pick the fastest sorting algorithm for N points with M objectives.
+    """
+    if m == 2:
+        return sweep_non_dominated_sort
+    if m > 2 and n >= BEST_ORDER_MIN_SIZE:
+        return best_order_sort
+    return vectorized_non_dominated_sort
+
+
+def iter_non_dominated_fronts(objectives):
+    """
+    Lazily peel the rows of an objective matrix into non-dominated fronts.
+
+    Fronts are produced one at a time, so a caller that only needs the first
+    few fronts can stop early and skip the ranking work for the rest. The
+    remaining points are kept in decreasing lexicographic order, where a point
+    can only be dominated by points before it. Walking that order, the first
+    point not dominated by an earlier front member is itself non-dominated, so
+    each front costs one vectorized comparison per member against the points
+    that are still left. Members of a front are in population order.
+    """
+    remaining = np.lexsort(-objectives.T[::-1])
+    while remaining.size:
+        rows = objectives[remaining]
+        alive = np.ones(len(remaining), dtype=bool)
+        members = []
+        i = 0
+        while i < len(remaining):
+            members.append(i)
+            tail = rows[i + 1:]
+            alive[i + 1:] &= ~(np.all(tail <= rows[i], axis=1) & np.any(tail < rows[i], axis=1))
+            alive[i] = False
+            if not alive.any():
+                break
+            i = int(np.argmax(alive))
+        in_front = np.zeros(len(remaining), dtype=bool)
+        in_front[members] = True
+        yield np.sort(remaining[in_front])
+        remaining = remaining[~in_front]
+
+
+class IncrementalFronts:
+    """
+    Non-dominated front structure that is updated point by point.
+
+    New points are inserted with the efficient non-domination level update of
+    Li, Deb, Zhang and Kwong (2015): the point goes into the first front that
+    holds no dominator of it, the members of that front it dominates move one
+    front down, the members of the next front dominated by those move down
+    again, and so on. Fronts the cascade never reaches are left untouched.
+    """
+
+    def __init__(self, m):
+        self.m = m
+        self.keys = []
+        self.rows = []
+
+    @classmethod
+    def from_objectives(cls, keys, objectives):
+        """
+        Build the structure for a whole population with a full sort.
+        """
+        fronts = cls(objectives.shape[1])
+        for front in select_sort_algorithm(*objectives.shape)(objectives):
+            if front.size:
+                fronts.keys.append([keys[i] for i in front])
+                fronts.rows.append(objectives[front])
+        return fronts
+
+    def __len__(self):
+        return sum(len(keys) for keys in self.keys)
+
+    def members(self):
+        return [key for keys in self.keys for key in keys]
+
+    def objectives(self):
+        if not self.rows:
+            return np.empty((0, self.m))
+        return np.concatenate(self.rows)
+
+    def insert(self, key, row):
+        row = np.asarray(row, dtype=np.float64)
+        lo, hi = 0, len(self.rows)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            rows = self.rows[mid]
+            if ((rows >= row).all(axis=1) & (rows > row).any(axis=1)).any():
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == len(self.rows):
+            self.keys.append([key])
+            self.rows.append(row[None, :])
+            return
+
+        moved_keys, moved_rows = [key], row[None, :]
+        k = lo
+        while moved_keys:
+            if k == len(self.rows):
+                self.keys.append(moved_keys)
+                self.rows.append(moved_rows)
+                break
+            keys, rows = self.keys[k], self.rows[k]
+            a = moved_rows[:, None, :]
+            b = rows[None, :, :]
+            dominated = ((a >= b).all(axis=2) & (a > b).any(axis=2)).any(axis=0)
+            stay = np.flatnonzero(~dominated)
+            down = np.flatnonzero(dominated)
+            self.keys[k] = [keys[i] for i in stay] + moved_keys
+            self.rows[k] = np.concatenate([rows[stay], moved_rows])
+            moved_keys, moved_rows = [keys[i] for i in down], rows[down]
+            k += 1
+
+    def pop_last(self, index):
+        """
+        Remove and return the key of a member of the last front. Nobody can
+        move up when a member of the last front leaves, so the structure stays
+        valid.
+        """
+        keys, rows = self.keys[-1], self.rows[-1]
+        key = keys.pop(index)
+        if keys:
+            self.rows[-1] = np.delete(rows, index, axis=0)
+        else:
+            self.keys.pop()
+            self.rows.pop()
+        return key
+
+    def retain(self, keep):
+        """
+        Drop every member whose key is not in keep. Nobody is moved up, so this
+        is only valid if no dropped member sits in an earlier front than a kept
+        one, as is the case for NSGA-II survivors.
+        """
+        fronts = []
+        for keys, rows in zip(self.keys, self.rows):
+            mask = np.array([key in keep for key in keys], dtype=bool)
+            if mask.any():
+                fronts.append(([key for key, kept in zip(keys, mask) if kept], rows[mask]))
+        self.keys = [keys for keys, _ in fronts]
+        self.rows = [rows for _, rows in fronts]
+
+
+def crowding_distance(objectives, front_ids):
+    """
+    Compute the NSGA-II crowding distance of the members of several fronts in
+    one batched call.
+
+    objectives holds one row per member and front_ids the front each row
+    belongs to. For every objective the rows are argsorted within their front,
+    with ties broken by the previous objectives in reverse order and then by
+    row order, which is the order repeated stable sorts of one list give. The
+    first and last member of a front get an infinite distance. Interior
+    members add the normalized gap between their neighbours, unless all
+    members of the front share the same value, in which case that objective
+    adds nothing.
+    """
+    n, m = objectives.shape
+    distances = np.zeros(n)
+    if n == 0:
+        return distances
+    position = np.arange(n)
+    for j in range(m):
+        values = objectives[:, j]
+        order = np.lexsort((position,) + tuple(objectives[:, :j + 1].T) + (front_ids,))
+        sorted_values = values[order]
+        sorted_ids = front_ids[order]
+        first = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+        last = np.r_[first[1:] - 1, n - 1]
+        size = last - first + 1
+        scale = np.repeat(sorted_values[last] - sorted_values[first], size)
+
+        interior = np.ones(n, dtype=bool)
+        interior[first] = False
+        interior[last] = False
+        interior &= scale != 0
+        i = np.flatnonzero(interior)
+        distances[order[i]] += (sorted_values[i + 1] - sorted_values[i - 1]) / scale[i]
+        distances[order[first]] = np.inf
+        distances[order[last]] = np.inf
+    return distances
@@ -0,0 +1,369 @@
+"""
+Speciation with the genomic distance of neat's DefaultGenome computed on
+arrays: the genes of all genomes of a generation are laid out over their
+sorted innovation keys, and the distances of a batch of representatives to
+a batch of genomes are a few array operations instead of a Python loop over
+genes per pair.
+"""
+import numpy as np
+
+from math import sqrt
+
+from neat.genome import DefaultGenome
+from neat.species import DefaultSpeciesSet, Species
+
+# Upper bound on the elements of one (representatives x genomes x genes) block
+BLOCK_SIZE = 1 << 21
+# Below this many (representatives x genomes) pairs per generation the Python
+# loop of DefaultSpeciesSet is faster than laying out the gene arrays
+MIN_PAIRS = 3000
+
+
+def _mean_stdev(values):
+    """
+    neat.math_util.mean and stdev of values. The squares are computed on an
+    array, the sums are the same built-in sums in the same order.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    m = sum(values.tolist()) / len(values)
+    return m, sqrt(sum(((values - m) ** 2).tolist()) / len(values))
+
+
+class _GeneTable(object):
+    """
+    One kind of gene (nodes or connections) of a set of genomes, as dense
+    (genomes x innovations) arrays over the sorted innovation keys, plus one
+    column that no genome has, for padding.
+
+    columns[row] lists the columns of the genes of a genome in the order of
+    its gene dict, the order DefaultGenome.distance sums the genes of the
+    first genome in. numeric are the attributes compared by absolute
+    difference, discrete the ones that add 1 when they differ, both in the
+    order the distance method of the gene compares them.
+    """
+
+    def __init__(self, encoded):
+        # encoded: per genome (keys, numeric, discrete), in dict order
+        keys = np.unique(np.concatenate([k for k, _, _ in encoded]))
+        n, u = len(encoded), len(keys)
+        self.padding = u
+        self.sizes = np.array([len(k) for k, _, _ in encoded], dtype=np.int64)
+        self.columns = []
+        self.present = np.zeros((n, u + 1), dtype=bool)
+        self.numeric = np.zeros((n, u + 1, encoded[0][1].shape[1]))
+        self.discrete = np.zeros((n, u + 1, encoded[0][2].shape[1]), dtype=np.int64)
+        for row, (k, numeric, discrete) in enumerate(encoded):
+            cols = np.searchsorted(keys, k)
+            self.columns.append(cols)
+            self.present[row, cols] = True
+            self.numeric[row, cols] = numeric
+            self.discrete[row, cols] = discrete
+
+    def distances(self, first, second, weight_coefficient, disjoint_coefficient):
+        """
+        The (len(first) x len(second)) gene distance terms of
+        DefaultGenome.distance, with the genomes of the rows first as self.
+        """
+        length = max([len(self.columns[row]) for row in first] + [1])
+        cols = np.full((len(first), length), self.padding, dtype=np.intp)
+        for i, row in enumerate(first):
+            cols[i, :len(self.columns[row])] = self.columns[row]
+
+        result = np.empty((len(first), len(second)))
+        chunk = max(1, BLOCK_SIZE // (max(len(second), 1) * length))
+        for start in range(0, len(first), chunk):
+            f = first[start:start + chunk]
+            c = cols[start:start + chunk]
+            a = (f[:, None, None], c[:, None, :])
+            b = (second[None, :, None], c[:, None, :])
+            # The genes of the first genome are all present, padding excepted
+            shared = self.present[a] & self.present[b]
+
+            numeric = np.abs(self.numeric[a] - self.numeric[b])
+            term = numeric[..., 0]
+            for j in range(1, numeric.shape[-1]):
+                term = term + numeric[..., j]
+            unequal = self.discrete[a] != self.discrete[b]
+            for j in range(unequal.shape[-1]):
+                term = term + unequal[..., j]
+            term = np.where(shared, term * weight_coefficient, 0.0)
+            # Sum the shared genes one by one, in the dict order of the first genome
+            total = np.cumsum(term, axis=-1)[..., -1]
+
+            sizes_first = self.sizes[f][:, None]
+            sizes_second = self.sizes[second][None, :]
+            disjoint = sizes_first + sizes_second - 2 * shared.sum(axis=-1)
+            largest = np.maximum(sizes_first, sizes_second)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                distance = (total + disjoint_coefficient * disjoint) / largest
+            result[start:start + chunk] = np.where(largest > 0, distance, 0.0)
+        return result
+
+
+class NSGA2SpeciesSet(DefaultSpeciesSet):
+    """
+    DefaultSpeciesSet with vectorized genomic distances.
+
+    The distances between representatives and genomes are computed in
+    blocks before they are needed, then speciation runs the loop of
+    DefaultSpeciesSet.speciate, distance cache included, on the precomputed
+    values. Species assignments, representatives and the reported distance
+    statistics are the same as those of DefaultSpeciesSet.
+
+    Genes are encoded once per genome. The distances of the representatives
+    are kept across generations for the genomes that live on, e.g. in the
+    steady-state population. Genome types with their own distance, and
+    generations with fewer than MIN_PAIRS pairs of a genome and a
+    representative of the previous generation, fall back to
+    DefaultSpeciesSet.speciate.
+
+    The section of the config file is that of DefaultSpeciesSet, see
+    select_species_set.
+    """
+
+    def __init__(self, config, reporters):
+        super().__init__(config, reporters)
+        self._encoded = {}
+        self._memo = {}
+        self._connection_ids = {}
+        self._function_ids = {}
+
+    @staticmethod
+    def _intern(table, value):
+        i = table.get(value)
+        if i is None:
+            i = table[value] = len(table)
+        return i
+
+    def _encode(self, genome):
+        cached = self._encoded.get(genome.key)
+        if cached is not None and cached[0] is genome:
+            return cached[1]
+
+        functions = self._function_ids
+        encoded = (
+            (np.array(list(genome.nodes.keys()), dtype=np.int64),
+             np.array([(n.bias, n.response) for n in genome.nodes.values()], dtype=np.float64).reshape(-1, 2),
+             np.array([(self._intern(functions, n.activation), self._intern(functions, n.aggregation))
+                       for n in genome.nodes.values()], dtype=np.int64).reshape(-1, 2)),
+            (np.array([self._intern(self._connection_ids, key) for key in genome.connections], dtype=np.int64),
+             np.array([c.weight for c in genome.connections.values()], dtype=np.float64).reshape(-1, 1),
+             np.array([c.enabled for c in genome.connections.values()], dtype=np.int64).reshape(-1, 1)),
+        )
+        self._encoded[genome.key] = (genome, encoded)
+        return encoded
+
+    def speciate(self, config, population, generation):
+        """
+        Place genomes into species by genetic similarity, exactly like
+        DefaultSpeciesSet.speciate.
+        """
+        assert isinstance(population, dict)
+        if not issubclass(config.genome_type, DefaultGenome) or \
+                config.genome_type.distance is not DefaultGenome.distance or \
+                len(self.species) * len(population) < MIN_PAIRS:
+            # The cached encodings and distances would not follow this generation
+            self._encoded = {}
+            self._memo = {}
+            return super().speciate(config, population, generation)
+
+        compatibility_threshold = self.species_set_config.compatibility_threshold
+        weight_coefficient = config.genome_config.compatibility_weight_coefficient
+        disjoint_coefficient = config.genome_config.compatibility_disjoint_coefficient
+
+        # One row per genome of the population and per current representative
+        genomes = dict(population)
+        for s in self.species.values():
+            genomes.setdefault(s.representative.key, s.representative)
+        row = {key: i for i, key in enumerate(genomes)}
+        encoded = [self._encode(g) for g in genomes.values()]
+        tables = [_GeneTable([e[0] for e in encoded]), _GeneTable([e[1] for e in encoded])]
+
+        def compute(first, second):
+            # (len(first) x len(second)) distances, with the genomes of first as self
+            first = np.array([row[key] for key in first], dtype=np.intp)
+            second = np.array([row[key] for key in second], dtype=np.intp)
+            return sum(table.distances(first, second, weight_coefficient, disjoint_coefficient)
+                       for table in tables)
+
+        if any(s.representative.key in population for s in self.species.values()):
+            # Old representatives live on, so the distance cache can hit
+            new_representatives, new_members, distances = self._partition_cached(
+                population, compute, compatibility_threshold)
+        else:
+            new_representatives, new_members, distances = self._partition(
+                population, compute, compatibility_threshold)
+
+        # Update species collection based on new speciation.
+        self.genome_to_species = {}
+        for sid, rid in new_representatives.items():
+            s = self.species.get(sid)
+            if s is None:
+                s = Species(sid, generation)
+                self.species[sid] = s
+
+            members = new_members[sid]
+            for gid in members:
+                self.genome_to_species[gid] = sid
+
+            member_dict = dict((gid, population[gid]) for gid in members)
+            s.update(population[rid], member_dict)
+
+        # Only the new representatives and genomes that live on can come up again
+        self._encoded = {key: value for key, value in self._encoded.items() if key in population}
+        self._memo = {rid: {gid: d for gid, d in self._memo[rid].items() if gid in population}
+                      for rid in new_representatives.values() if rid in self._memo}
+
+        gdmean, gdstdev = _mean_stdev(distances)
+        self.reporters.info(
+            'Mean genetic distance {0:.3f}, standard deviation {1:.3f}'.format(gdmean, gdstdev))
+
+    def _partition(self, population, compute, compatibility_threshold):
+        """
+        The partition of DefaultSpeciesSet.speciate when no old representative
+        is in the population. Then no pair of genomes comes up twice, so the
+        distance cache never hits and whole rows of distances can be compared
+        at once. Returns the new representatives and members and the cached
+        distances, in the order the cache of DefaultSpeciesSet stores them.
+        """
+        distances = []
+
+        # Find the best representatives for each existing species.
+        unspeciated = set(population.keys())
+        index = {gid: i for i, gid in enumerate(population)}
+        block = compute([s.representative.key for s in self.species.values()], list(population))
+        new_representatives = {}
+        new_members = {}
+        for (sid, s), d in zip(self.species.items(), block):
+            candidates = list(unspeciated)
+            d = d[[index[gid] for gid in candidates]]
+            distances.append(d)
+
+            # The new representative is the genome closest to the current representative.
+            new_rid = candidates[int(np.argmin(d))]
+            new_representatives[sid] = new_rid
+            new_members[sid] = [new_rid]
+            unspeciated.remove(new_rid)
+
+        # Distances of the remaining genomes to the representatives, one column
+        # per representative, filled in as the representatives come up
+        remaining = list(unspeciated)
+        index = {gid: i for i, gid in enumerate(remaining)}
+        species_ids = list(new_representatives.keys())
+        to_representative = np.empty((len(remaining), len(species_ids) + len(remaining)))
+        if species_ids and remaining:
+            to_representative[:, :len(species_ids)] = compute(list(new_representatives.values()), remaining).T
+
+        # Partition population into species based on genetic similarity.
+        while unspeciated:
+            gid = unspeciated.pop()
+
+            # Find the species with the most similar representative.
+            d = to_representative[index[gid], :len(species_ids)]
+            distances.append(d)
+            candidates = d < compatibility_threshold
+            if candidates.any():
+                sid = species_ids[int(np.argmin(np.where(candidates, d, np.inf)))]
+                new_members[sid].append(gid)
+            else:
+                # No species is similar enough, create a new species, using
+                # this genome as its representative.
+                sid = next(self.indexer)
+                new_representatives[sid] = gid
+                new_members[sid] = [gid]
+                species_ids.append(sid)
+                if unspeciated:
+                    rest = list(unspeciated)
+                    to_representative[[index[g] for g in rest], len(species_ids) - 1] = compute([gid], rest)[0]
+
+        self._memo = {}
+        # The cache stores every distance under both orders of the pair
+        return new_representatives, new_members, np.repeat(np.concatenate(distances), 2)
+
+    def _partition_cached(self, population, compute, compatibility_threshold):
+        """
+        The partition of DefaultSpeciesSet.speciate, distance cache included,
+        over distances computed in blocks beforehand and memoized across
+        generations. Returns the new representatives and members and the
+        cached distances.
+        """
+        memo = self._memo
+
+        def precompute(representatives, gids):
+            # distance(representative, genome) of the pairs not known yet
+            gids = list(gids)
+            missing = {}
+            for rid in representatives:
+                known = memo.setdefault(rid, {})
+                todo = [gid for gid in gids if gid not in known]
+                if todo:
+                    missing[rid] = todo
+            if missing:
+                second = list(dict.fromkeys(gid for todo in missing.values() for gid in todo))
+                for rid, d in zip(missing, compute(list(missing), second).tolist()):
+                    memo[rid].update(zip(second, d))
+
+        # The distance cache of DefaultSpeciesSet, over the memoized values
+        distances = {}
+
+        def distance(rid, gid):
+            d = distances.get((rid, gid))
+            if d is None:
+                d = memo[rid][gid]
+                distances[rid, gid] = d
+                distances[gid, rid] = d
+            return d
+
+        # Find the best representatives for each existing species.
+        unspeciated = set(population.keys())
+        precompute([s.representative.key for s in self.species.values()], unspeciated)
+        new_representatives = {}
+        new_members = {}
+        for sid, s in self.species.items():
+            candidates = []
+            for gid in unspeciated:
+                d = distance(s.representative.key, gid)
+                candidates.append((d, gid))
+
+            # The new representative is the genome closest to the current representative.
+            ignored_rdist, new_rid = min(candidates, key=lambda x: x[0])
+            new_representatives[sid] = new_rid
+            new_members[sid] = [new_rid]
+            unspeciated.remove(new_rid)
+
+        # Partition population into species based on genetic similarity.
+        precompute(new_representatives.values(), unspeciated)
+        while unspeciated:
+            gid = unspeciated.pop()
+
+            # Find the species with the most similar representative.
+            candidates = []
+            for sid, rid in new_representatives.items():
+                d = distance(rid, gid)
+                if d < compatibility_threshold:
+                    candidates.append((d, sid))
+
+            if candidates:
+                ignored_sdist, sid = min(candidates, key=lambda x: x[0])
+                new_members[sid].append(gid)
+            else:
+                # No species is similar enough, create a new species, using
+                # this genome as its representative.
+                sid = next(self.indexer)
+                new_representatives[sid] = gid
+                new_members[sid] = [gid]
+                precompute([gid], unspeciated)
+
+        return new_representatives, new_members, list(distances.values())
+
+
+def select_species_set(config):
+    """
+    Speciate with NSGA2SpeciesSet instead of DefaultSpeciesSet when the
+    population is large enough to get to MIN_PAIRS pairs. Load the config
+    with DefaultSpeciesSet, so the compatibility threshold is read from the
+    [DefaultSpeciesSet] section; both parse the same parameters.
+    """
+    if config.species_set_type is DefaultSpeciesSet and config.pop_size ** 2 >= MIN_PAIRS:
+        config.species_set_type = NSGA2SpeciesSet
+    return config
@@ -0,0 +1,161 @@
+import queue
+import random
+
+import numpy as np
+
+from .fitness import NSGA2Fitness
+from .population import NSGA2Population
+from .sorting import IncrementalFronts, crowding_distance, objective_matrix
+from .store import ObjectiveStore
+
+
+class SteadyStateNSGA2Population(NSGA2Population):
+    """
+    Asynchronous steady-state (mu + 1) variant of NSGA-II:
+        1. Evaluate the initial population.
+        2. Keep every worker busy with one offspring each.
+        3. Whenever an evaluation comes back, insert the offspring into the
+           non-dominated fronts and drop the member of the last front with
+           the smallest crowding distance.
+        4. Submit a new offspring in its place.
+
+    There is no generational barrier, so a long episode only holds up its own
+    worker. Parents are picked by binary tournament on the crowded comparison,
+    the second one from the species of the first. Every generation_size
+    evaluations (pop_size by default) a virtual generation is reported with
+    the usual reporter events, and the population is respeciated. Species
+    stagnation is not applied in this mode.
+    """
+
+    def run(self, evaluator, n=None, generation_size=None):
+        """
+        Runs at most n virtual generations. evaluator must provide
+        submit(genome, config, callback, error_callback) and a num_workers
+        attribute, like NSGA2ParallelEvaluator.
+        """
+        if self.config.no_fitness_termination and (n is None):
+            raise RuntimeError("Cannot have no generational limit with no fitness termination")
+        if generation_size is None:
+            generation_size = self.config.pop_size
+
+        results = queue.Queue()
+
+        def submit(genome):
+            evaluator.submit(genome, self.config,
+                             lambda values: results.put((genome, values)),
+                             lambda error: results.put((genome, error)))
+
+        def collect():
+            genome, values = results.get()
+            if isinstance(values, BaseException):
+                raise values
+            genome.fitness = NSGA2Fitness(0.0, np.asarray(values, dtype=np.float64))
+            return genome
+
+        # Evaluate the initial population with the same pool
+        unevaluated = [g for g in self.population.values() if g.fitness is None]
+        for genome in unevaluated:
+            submit(genome)
+        for _ in unevaluated:
+            collect()
+        keys = list(self.population.keys())
+        self.fronts = IncrementalFronts.from_objectives(keys, objective_matrix(self.population))
+        self._assign_fronts()
+
+        k = 0
+        evaluations = 0
+        in_flight = 0
+        while n is None or k < n:
+            if evaluations % generation_size == 0:
+                self.reporters.start_generation(self.generation)
+            while in_flight < evaluator.num_workers:
+                submit(self._offspring())
+                in_flight += 1
+
+            child = collect()
+            in_flight -= 1
+            self._insert(child)
+            evaluations += 1
+
+            if evaluations % generation_size == 0:
+                k += 1
+                if self._virtual_generation():
+                    break
+
+        # Results that come back after the last generation are dropped
+        for _ in range(in_flight):
+            results.get()
+
+        if self.config.no_fitness_termination:
+            self.reporters.found_solution(self.config, self.generation, self.best_genome)
+
+        return self.best_genome, self.non_dominated
+
+    def _tournament(self, keys):
+        a = self.population[random.choice(keys)]
+        b = self.population[random.choice(keys)]
+        return a if a.fitness.sort_key >= b.fitness.sort_key else b
+
+    def _offspring(self):
+        keys = list(self.population.keys())
+        parent_a = self._tournament(keys)
+        sid = self.species.genome_to_species.get(parent_a.key)
+        candidates = []
+        if sid in self.species.species:
+            candidates = [key for key in self.species.species[sid].members if key in self.population]
+        parent_b = self._tournament(candidates if len(candidates) >= 2 else keys)
+
+        gid = next(self.reproduction.genome_indexer)
+        child = self.config.genome_type(gid)
+        child.configure_crossover(parent_a, parent_b, self.config.genome_config)
+        child.mutate(self.config.genome_config)
+        return child
+
+    def _insert(self, genome):
+        self.fronts.insert(genome.key, genome.fitness.values)
+        self.population[genome.key] = genome
+        if len(self.population) > self.config.pop_size:
+            last = self.fronts.rows[-1]
+            worst = int(np.argmin(crowding_distance(last, np.zeros(len(last), dtype=np.intp))))
+            del self.population[self.fronts.pop_last(worst)]
+        self._assign_fronts()
+
+    def _assign_fronts(self):
+        # Ranks and crowding distances of the whole population, from the incremental fronts
+        keys = self.fronts.members()
+        objectives = self.fronts.objectives()
+        front_ids = np.repeat(np.arange(len(self.fronts.keys)), [len(f) for f in self.fronts.keys])
+        distances = crowding_distance(objectives, front_ids)
+        fitnesses = []
+        for key, front_id, d in zip(keys, front_ids.tolist(), distances.tolist()):
+            fitness = self.population[key].fitness
+            fitness.rank = -front_id
+            fitness.crowding_dist = d
+            fitnesses.append(fitness)
+        self.objectives = ObjectiveStore(keys, fitnesses, objectives, -front_ids, distances)
+
+    def _virtual_generation(self):
+        """
+        Report a generation and respeciate. Returns True if the fitness
+        threshold is reached.
+        """
+        self.population = dict(sorted(self.population.items(), key=lambda item: item[1].fitness.sort_key,
+                                      reverse=True))
+        self.reporters.post_sort(self.config, self.objectives)
+        self.non_dominated = {self.population[key] for key in self.objectives.front_keys()}
+
+        best = next(iter(self.population.values()))
+        self.reporters.post_evaluate(self.config, self.population, self.species, best)
+        if self.best_genome is None or best.fitness.sort_key > self.best_genome.fitness.sort_key:
+            self.best_genome = best
+
+        if not self.config.no_fitness_termination:
+            fv = self.fitness_criterion(g.fitness for g in self.population.values())
+            if fv >= self.config.fitness_threshold:
+                self.reporters.found_solution(self.config, self.generation, best)
+                return True
+
+        self.species.speciate(self.config, self.population, self.generation)
+        self.reporters.end_generation(self.config, self.population, self.species)
+        self.generation += 1
+        return False
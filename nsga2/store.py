@@ -0,0 +1,90 @@
+import numpy as np
+
+
+class ObjectiveStore:
+    """
+    Population-level view of the NSGA-II state: a contiguous (N x M) float64
+    matrix of objective values with the rank and crowding distance of every
+    row, and an index from genome key to row.
+
+    The per-genome NSGA2Fitness objects stay the source of the values (neat
+    only knows about genome.fitness), the store keeps a reference to each of
+    them so rows can be reused for as long as a genome keeps the same fitness
+    object.
+    """
+
+    def __init__(self, keys, fitnesses, objectives, rank=None, crowding=None):
+        self.keys = list(keys)
+        self.fitnesses = list(fitnesses)
+        self.objectives = np.ascontiguousarray(objectives, dtype=np.float64).reshape(len(self.keys), -1)
+        n = len(self.keys)
+        self.rank = np.zeros(n) if rank is None else np.asarray(rank, dtype=np.float64)
+        self.crowding = np.zeros(n) if crowding is None else np.asarray(crowding, dtype=np.float64)
+        self.index = {key: i for i, key in enumerate(self.keys)}
+
+    @classmethod
+    def from_genomes(cls, population, reuse=None):
+        """
+        Build the store for a dict of genomes. Rows of genomes that are in the
+        reuse store with the same fitness object are copied from it instead of
+        being gathered from the fitness values again.
+        """
+        keys = list(population.keys())
+        fitnesses = []
+        reused = []
+        gathered = []
+        gathered_values = []
+        for i, g in enumerate(population.values()):
+            if g.fitness is None:
+                raise RuntimeError("Fitness not assigned to genome {}".format(g.key))
+            fitnesses.append(g.fitness)
+            row = reuse.index.get(g.key) if reuse is not None else None
+            if row is not None and reuse.fitnesses[row] is g.fitness:
+                reused.append((i, row))
+            else:
+                gathered.append(i)
+                gathered_values.append(g.fitness.values)
+
+        if gathered:
+            values = np.asarray(gathered_values, dtype=np.float64)
+            m = values.shape[1]
+        elif reused:
+            m = reuse.objectives.shape[1]
+        else:
+            m = 0
+        objectives = np.empty((len(keys), m))
+        if gathered:
+            objectives[gathered] = values
+        if reused:
+            rows, reuse_rows = zip(*reused)
+            objectives[list(rows)] = reuse.objectives[list(reuse_rows)]
+        return cls(keys, fitnesses, objectives)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def rows(self, keys):
+        return np.fromiter((self.index[key] for key in keys), dtype=np.intp, count=len(keys))
+
+    def subset(self, keys):
+        """
+        New store holding only the given keys, in the given order.
+        """
+        rows = self.rows(keys)
+        return ObjectiveStore(keys, [self.fitnesses[i] for i in rows], self.objectives[rows],
+                              self.rank[rows], self.crowding[rows])
+
+    def front_rows(self, rank=0):
+        return np.flatnonzero(self.rank == rank)
+
+    def front_keys(self, rank=0):
+        return [self.keys[i] for i in self.front_rows(rank)]
+
+    def front(self, rank=0):
+        """
+        Objective values of the members of a front, the non-dominated front by default.
+        """
+        return self.objectives[self.front_rows(rank)]
@@ -0,0 +1,188 @@
+"""
+All front indicators from one pass over a front: the front is deduplicated
+(and so sorted) once, and the distance computations are shared between the
+indicators. The values match the functions of performance_indicators, which
+are built on this module.
+
+Known Pareto fronts for IGD can be large; ReferenceFront keeps one in
+memory, load_reference_front caches them per file, and front_metrics_many
+evaluates many fronts against one in parallel.
+"""
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from .hypervolume import MAX_EXACT_OBJECTIVES, hypervolume as front_hypervolume
+
+# From this many front points on, IGD queries a k-d tree of the front
+TREE_MIN_POINTS = 64
+
+
+def sparsity_of(front):
+    # The sorted gaps of every objective add up to its range
+    if len(front) < 2:
+        return 0.0
+    return float(np.ptp(front, axis=0).sum() / (len(front) - 1))
+
+
+def spacing_of(unique, counts):
+    """
+    Spacing of the front with the given unique points and their counts: the
+    standard deviation of the Manhattan distances of all points to their
+    nearest neighbours, as pymoo's SpacingIndicator. Repeated points are
+    their own nearest neighbours.
+    """
+    n = int(counts.sum())
+    if n < 2:
+        return 0.0
+    if len(unique) > 1:
+        distances = np.abs(unique[:, None, :] - unique[None, :, :]).sum(axis=2)
+        np.fill_diagonal(distances, np.inf)
+        nearest = distances.min(axis=1)
+    else:
+        nearest = np.zeros(1)
+    nearest[counts > 1] = 0.0
+    nearest = np.repeat(nearest, counts)
+    return float(np.sqrt(np.mean((nearest - nearest.mean()) ** 2)))
+
+
+class ReferenceFront(object):
+    def __init__(self, points):
+        """
+        A known Pareto front of maximised objectives to measure the IGD and
+        IGD+ of fronts against.
+
+        IGD asks for the nearest front point of every reference point, so the
+        k-d tree is built over the (small) front and the reference points are
+        streamed through it; fronts smaller than TREE_MIN_POINTS are swept
+        point by point instead. IGD+ only counts the objectives in which the
+        reference point is better, which is no metric for a k-d tree; it is
+        swept point by point over the columns of the reference front. Memory
+        stays linear in the size of the reference front.
+        """
+        self.points = np.ascontiguousarray(points, dtype=np.float64)
+        self.columns = np.ascontiguousarray(self.points.T)
+
+    def __len__(self):
+        return len(self.points)
+
+    def _nearest_squared(self, unique, better_only):
+        # Squared distance of every reference point to its nearest front point
+        nearest = np.full(len(self.points), np.inf)
+        total = np.empty(len(self.points))
+        column = np.empty(len(self.points))
+        for point in unique:
+            total[:] = 0.0
+            for k, value in enumerate(point):
+                np.subtract(self.columns[k], value, out=column)
+                if better_only:
+                    np.maximum(column, 0.0, out=column)
+                np.multiply(column, column, out=column)
+                total += column
+            np.minimum(nearest, total, out=nearest)
+        return nearest
+
+    def distances(self, unique):
+        """
+        IGD and IGD+ of a front with the given unique points.
+        """
+        if len(unique) < TREE_MIN_POINTS:
+            igd = np.sqrt(self._nearest_squared(unique, False)).mean()
+        else:
+            igd = cKDTree(unique).query(self.points)[0].mean()
+        igd_plus = np.sqrt(self._nearest_squared(unique, True)).mean()
+        return float(igd), float(igd_plus)
+
+
+_reference_fronts = {}
+
+
+def load_reference_front(path):
+    """
+    The ReferenceFront of a wandb table file with the points under "data",
+    read once per file for as long as the file does not change.
+    """
+    key = (os.path.abspath(path), os.path.getmtime(path))
+    if key not in _reference_fronts:
+        with open(path, "r") as f:
+            _reference_fronts[key] = ReferenceFront(np.array(json.load(f)["data"]))
+    return _reference_fronts[key]
+
+
+def igd_of(unique, reference_front):
+    """
+    IGD and IGD+ of a front with the given unique points: the mean over the
+    points of reference_front, an array or a ReferenceFront, of the Euclidean
+    distance to the nearest point of the front, and of the distance counting
+    only the objectives in which the reference point is better (larger).
+    """
+    if not isinstance(reference_front, ReferenceFront):
+        reference_front = ReferenceFront(reference_front)
+    return reference_front.distances(unique)
+
+
+class FrontMetrics(object):
+    def __init__(self, hypervolume, sparsity, cardinality, spacing, igd=None, igd_plus=None):
+        """
+        The indicators of one front; hypervolume is None without a reference
+        point, igd and igd_plus without a reference front.
+        """
+        self.hypervolume = hypervolume
+        self.sparsity = sparsity
+        self.cardinality = cardinality
+        self.spacing = spacing
+        self.igd = igd
+        self.igd_plus = igd_plus
+
+    def as_dict(self):
+        return {
+            "hypervolume": self.hypervolume,
+            "sparsity": self.sparsity,
+            "cardinality": self.cardinality,
+            "spacing": self.spacing,
+            "inverted_generational_distance": self.igd,
+            "inverted_generational_distance_plus": self.igd_plus,
+        }
+
+
+def front_metrics(front, ref_point=None, reference_front=None, hypervolume=None,
+                  max_exact_objectives=MAX_EXACT_OBJECTIVES):
+    """
+    FrontMetrics of an (n x m) front of maximised objectives. The
+    hypervolume is computed with respect to ref_point unless it is passed in,
+    e.g. from an IncrementalHypervolume; IGD and IGD+ need the known Pareto
+    front as reference_front, an array or a ReferenceFront.
+
+    Sparsity and spacing are those of the front as given, duplicates
+    included; cardinality counts the distinct points.
+    """
+    front = np.asarray(front, dtype=np.float64)
+    if front.size == 0:
+        return FrontMetrics(0.0 if ref_point is not None or hypervolume is not None else None, 0.0, 0, 0.0)
+    front = front.reshape(len(front), -1)
+    unique, counts = np.unique(front, axis=0, return_counts=True)
+
+    if hypervolume is None and ref_point is not None:
+        hypervolume = front_hypervolume(ref_point, unique, max_exact_objectives)
+    igd = igd_plus = None
+    if reference_front is not None:
+        igd, igd_plus = igd_of(unique, reference_front)
+    return FrontMetrics(hypervolume, sparsity_of(front), len(unique), spacing_of(unique, counts), igd, igd_plus)
+
+
+def front_metrics_many(fronts, ref_point=None, reference_front=None, workers=None,
+                       max_exact_objectives=MAX_EXACT_OBJECTIVES):
+    """
+    front_metrics of every front in fronts, computed by a pool of workers
+    threads (as many as CPUs by default); the k-d tree queries and the numpy
+    blocks run without the GIL. reference_front is wrapped in a
+    ReferenceFront once for all fronts.
+    """
+    if reference_front is not None and not isinstance(reference_front, ReferenceFront):
+        reference_front = ReferenceFront(reference_front)
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        return list(pool.map(lambda front: front_metrics(front, ref_point, reference_front,
+                                                         max_exact_objectives=max_exact_objectives), fronts))
@@ -0,0 +1,259 @@
+"""
+Exact hypervolume of maximisation fronts with respect to a reference point
+below them: a sort-and-sweep for two objectives, a sweep over the third
+objective with a two-dimensional staircase for three (as in HV3D), and
+pymoo for more. IncrementalHypervolume follows a front over the generations
+and only accounts for the points that were added or removed.
+
+Exact hypervolume gets exponentially more expensive with the number of
+objectives; above max_exact_objectives the hypervolume is estimated by
+sampling the box between the reference point and the front.
+
+Points that do not exceed the reference point in every objective add
+nothing to the hypervolume.
+"""
+import time
+from bisect import bisect_left, bisect_right
+from statistics import NormalDist
+
+import numpy as np
+
+# Fronts of fewer points are handled without numpy
+SMALL_FRONT = 100
+# More objectives than this are estimated by monte_carlo_hypervolume. Measured
+# with benchmarks/hypervolume_benchmark.py on fronts of up to 100 points: up to
+# seven objectives the exact value from pymoo is faster than an estimate to 1%
+# error, at eight the estimate wins.
+MAX_EXACT_OBJECTIVES = 7
+
+
+def _gains(ref_point, points):
+    # Per-objective distance above the reference point, of the points that count
+    points = np.asarray(points, dtype=np.float64)
+    ref_point = np.asarray(ref_point, dtype=np.float64)
+    if points.size == 0:
+        return np.zeros((0, len(ref_point)))
+    gains = points.reshape(-1, len(ref_point)) - ref_point
+    return gains[(gains > 0).all(axis=1)]
+
+
+class _Staircase:
+    """
+    Non-dominated set of two-dimensional gains, sorted by increasing x (and
+    so decreasing y), together with the area it dominates.
+    """
+
+    def __init__(self):
+        self.x = []
+        self.y = []
+        self.area = 0.0
+
+    def __len__(self):
+        return len(self.x)
+
+    def insert(self, x, y):
+        """
+        Adds a point, dropping the points it dominates, and returns the area
+        it added.
+        """
+        i = bisect_left(self.x, x)
+        # A point at the same or a larger x with at least the same y covers it
+        if i < len(self.x) and self.y[i] >= y:
+            return 0.0
+        right_y = self.y[i] if i < len(self.x) else 0.0
+        if i < len(self.x) and self.x[i] == x:
+            right_y = self.y[i + 1] if i + 1 < len(self.x) else 0.0
+            j = i + 1
+        else:
+            j = i
+        # Points to the left with a y of at most y are dominated by the new point
+        first = i
+        while first > 0 and self.y[first - 1] <= y:
+            first -= 1
+        prev_x = self.x[first - 1] if first > 0 else 0.0
+
+        added = 0.0
+        for k in range(first, j):
+            added += (self.x[k] - prev_x) * (y - max(self.y[k], right_y))
+            prev_x = self.x[k]
+        added += (x - prev_x) * (y - right_y)
+
+        self.x[first:j] = [x]
+        self.y[first:j] = [y]
+        self.area += added
+        return added
+
+    def remove(self, x, y):
+        """
+        Removes a point of the set and returns the area only it dominated.
+        """
+        i = bisect_left(self.x, x)
+        if i == len(self.x) or self.x[i] != x or self.y[i] != y:
+            raise RuntimeError("Point ({0}, {1}) is not on the staircase".format(x, y))
+        left_x = self.x[i - 1] if i > 0 else 0.0
+        right_y = self.y[i + 1] if i + 1 < len(self.x) else 0.0
+        removed = (x - left_x) * (y - right_y)
+        del self.x[i]
+        del self.y[i]
+        self.area -= removed
+        return removed
+
+
+def hypervolume_2d(ref_point, points):
+    """
+    Hypervolume of two-objective points: sorted by decreasing first
+    objective, every point adds the strip above the highest second objective
+    seen so far. O(n log n); small fronts are swept in plain Python, which
+    beats the numpy call overhead.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(points) < SMALL_FRONT:
+        rx, ry = float(ref_point[0]), float(ref_point[1])
+        gains = sorted(((x - rx, y - ry) for x, y in points.tolist() if x > rx and y > ry), reverse=True)
+        area = top = 0.0
+        for x, y in gains:
+            if y > top:
+                area += x * (y - top)
+                top = y
+        return area
+
+    gains = _gains(ref_point, points)
+    if len(gains) == 0:
+        return 0.0
+    order = np.lexsort((-gains[:, 1], -gains[:, 0]))
+    x = gains[order, 0]
+    y = np.maximum.accumulate(gains[order, 1])
+    heights = np.diff(y, prepend=0.0)
+    return float(np.dot(x, heights))
+
+
+def hypervolume_3d(ref_point, points):
+    """
+    Hypervolume of three-objective points, swept along the third objective
+    from the top: each point is inserted into the staircase of the first two
+    objectives, whose area times the distance to the next point is one slab
+    of the volume.
+    """
+    gains = _gains(ref_point, points)
+    if len(gains) == 0:
+        return 0.0
+    gains = gains[np.argsort(-gains[:, 2], kind='stable')]
+    z = np.append(gains[:, 2], 0.0)
+    staircase = _Staircase()
+    volume = 0.0
+    for i, (x, y, _) in enumerate(gains.tolist()):
+        staircase.insert(x, y)
+        volume += staircase.area * (z[i] - z[i + 1])
+    return volume
+
+
+def monte_carlo_hypervolume(ref_point, points, error=0.01, time_budget=None, confidence=0.95,
+                            batch_size=10000, max_samples=10 ** 7, rng=None):
+    """
+    Estimate of the hypervolume from points drawn uniformly from the box
+    between ref_point and the largest value of every objective. A sample is
+    dominated if some point is at least as large in every objective; the
+    tests run on batches of samples at once.
+
+    Sampling stops once the half-width of the confidence interval is at most
+    error relative to the estimate, after time_budget seconds or after
+    max_samples samples, whichever comes first. Returns the estimate and the
+    (low, high) Wilson interval at the given confidence.
+    """
+    gains = _gains(ref_point, points)
+    if len(gains) == 0:
+        return 0.0, (0.0, 0.0)
+    rng = np.random.default_rng() if rng is None else rng
+    upper = gains.max(axis=0)
+    box = float(np.prod(upper))
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    # Bound the (samples x points) dominance matrix to a million entries
+    chunk = max(1, 2 ** 20 // len(gains))
+
+    start = time.perf_counter()
+    samples = hits = 0
+    while True:
+        for lo in range(0, batch_size, chunk):
+            draws = rng.random((min(chunk, batch_size - lo), gains.shape[1])) * upper
+            # One objective at a time is faster than reducing a 3D comparison
+            dominated = draws[:, 0, None] <= gains[:, 0]
+            for k in range(1, gains.shape[1]):
+                dominated &= draws[:, k, None] <= gains[:, k]
+            hits += int(dominated.any(axis=1).sum())
+        samples += batch_size
+
+        fraction = hits / samples
+        centre = (fraction + z * z / (2 * samples)) / (1 + z * z / samples)
+        half = z / (1 + z * z / samples) * np.sqrt(fraction * (1 - fraction) / samples + z * z / (4 * samples ** 2))
+        if half <= error * fraction or samples >= max_samples or \
+                (time_budget is not None and time.perf_counter() - start >= time_budget):
+            break
+    return box * fraction, (box * max(0.0, centre - half), box * min(1.0, centre + half))
+
+
+def hypervolume(ref_point, points, max_exact_objectives=MAX_EXACT_OBJECTIVES, **monte_carlo):
+    """
+    Hypervolume of points with respect to ref_point. Exact for up to
+    max_exact_objectives objectives, more than three are handed to pymoo;
+    above that the estimate of monte_carlo_hypervolume, with its keyword
+    arguments.
+    """
+    m = len(ref_point)
+    if m > max_exact_objectives:
+        return monte_carlo_hypervolume(ref_point, points, **monte_carlo)[0]
+    if m == 2:
+        return hypervolume_2d(ref_point, points)
+    if m == 3:
+        return hypervolume_3d(ref_point, points)
+    from pymoo.indicators.hv import HV
+    gains = _gains(ref_point, points)
+    if len(gains) == 0:
+        return 0.0
+    return float(HV(ref_point=np.zeros(m))(-gains))
+
+
+class IncrementalHypervolume:
+    def __init__(self, ref_point, max_exact_objectives=MAX_EXACT_OBJECTIVES, **monte_carlo):
+        """
+        Hypervolume of a front that changes a little from one call of update
+        to the next. For two objectives the points that left the front are
+        removed from a staircase and the new ones inserted, each changing the
+        hypervolume by its exclusive contribution; otherwise update computes
+        the hypervolume again, like hypervolume with the same arguments.
+        """
+        self.ref_point = np.asarray(ref_point, dtype=np.float64)
+        self.max_exact_objectives = max_exact_objectives
+        self.monte_carlo = monte_carlo
+        self.points = set()
+        self.staircase = _Staircase()
+        self.value = 0.0
+
+    def update(self, front):
+        """
+        Replaces the tracked front by front, an (n x m) array, and returns
+        its hypervolume. Fronts with dominated points are handled by
+        rebuilding the staircase.
+        """
+        points = set(map(tuple, _gains(self.ref_point, front).tolist()))
+        if len(self.ref_point) != 2:
+            self.points = points
+            self.value = hypervolume(np.zeros(len(self.ref_point)), np.array(list(points)),
+                                     self.max_exact_objectives, **self.monte_carlo)
+            return self.value
+
+        staircase = self.staircase
+        for x, y in self.points - points:
+            # Dominated points were never on the staircase
+            i = bisect_right(staircase.x, x) - 1
+            if i >= 0 and staircase.x[i] == x and staircase.y[i] == y:
+                staircase.remove(x, y)
+        for x, y in points - self.points:
+            staircase.insert(x, y)
+        if len(staircase) != len(points):
+            # front held dominated points, which a removal could uncover later
+            staircase = self.staircase = _Staircase()
+            for x, y in points:
+                staircase.insert(x, y)
+        self.points = points
+        self.value = staircase.area
+        return self.value
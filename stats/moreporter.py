@@ -1,57 +1,112 @@
 from neat.reporting import BaseReporter
-import wandb
-from .performance_indicators import hypervolume, sparsity, cardinality
+import numpy as np
+from .hypervolume import MAX_EXACT_OBJECTIVES, IncrementalHypervolume, monte_carlo_hypervolume
+from .front_metrics import front_metrics
+from .sinks import WandbSink
+from .throughput import PHASES, throughput
 
 import time
 
 class MOReporter(BaseReporter):
 
 
-    def __init__(self, ref_point) -> None:
-        self.geration_start_time = None
+    def __init__(self, ref_point, max_exact_objectives=MAX_EXACT_OBJECTIVES, hv_error=0.01, hv_time_budget=None,
+                 sink=None) -> None:
+        """
+        With more objectives than max_exact_objectives the hypervolume is a
+        Monte Carlo estimate to within hv_error (relative) or hv_time_budget
+        seconds, logged together with its confidence interval.
+
+        The metrics go to sink, one of stats.sinks, straight to wandb by
+        default. The time spent handing them over is printed every generation.
+        """
+        self.generation_start_time = None
         self.generation_times = []
+        self.timing = None
         self.generation = None
         self.cur_hyper_volume = 0
         self.cur_cardinality = 0
         self.cur_sparsity = 0
+        self.cur_spacing = 0
         self.ref_point = ref_point
+        self.approximate = len(ref_point) > max_exact_objectives
+        self.hv_error = hv_error
+        self.hv_time_budget = hv_time_budget
+        self.cur_hv_interval = None
+        # Own generator, sampling must not disturb the random state of the run
+        self.rng = np.random.default_rng(0)
+        # Consecutive fronts differ in a few points only
+        self.hypervolume = IncrementalHypervolume(ref_point, max_exact_objectives, error=hv_error,
+                                                  time_budget=hv_time_budget, rng=self.rng)
+        self.front = None
+        self.sink = sink if sink is not None else WandbSink()
+        self.log_time = 0.0
 
 
     def start_generation(self, generation):
         self.generation = generation
         print('\n ****** Running generation {0} ****** \n'.format(generation))
-        self.geration_start_time = time.time()
+        self.generation_start_time = time.time()
+        self.timing = None
+
+    def post_sort(self, config, objectives):
+        # The non-dominated front is read straight from the objective store
+        self.front = objectives.front()
 
     def post_evaluate(self, config, population, species, best_genome):
-        # Get the non-dominated solutions
-        non_dominated = [g for g in population.values() if g.fitness.rank == 0]
-        # Calculate the hypervolume
-        self.cur_hyper_volume = hypervolume(self.ref_point, [g.fitness.values for g in non_dominated])
-
-        # Calculate the sparsity
-        self.cur_sparsity = sparsity([g.fitness.values for g in non_dominated])
-        # Calculate the cardinality
-        self.cur_cardinality = cardinality([g.fitness.values for g in non_dominated])
-        # Log the metrics to wandb
-        wandb.log({
+        # Get the non-dominated solutions, gathered from the genomes when no store was reported
+        front = self.front
+        if front is None:
+            front = np.array([g.fitness.values for g in population.values() if g.fitness.rank == 0])
+        self.front = None
+        # Calculate the hypervolume, estimated for many objectives
+        if self.approximate:
+            self.cur_hyper_volume, self.cur_hv_interval = monte_carlo_hypervolume(
+                self.ref_point, front, error=self.hv_error, time_budget=self.hv_time_budget, rng=self.rng)
+        else:
+            self.cur_hyper_volume = self.hypervolume.update(front)
+
+        # The other indicators in one pass over the front
+        metrics = front_metrics(front, hypervolume=self.cur_hyper_volume)
+        self.cur_sparsity = metrics.sparsity
+        self.cur_cardinality = metrics.cardinality
+        self.cur_spacing = metrics.spacing
+        # Log the metrics, the front goes out with the next commit
+        metrics = {
             "eval/hypervolume": self.cur_hyper_volume,
             "eval/sparsity": self.cur_sparsity,
             "eval/cardinality": self.cur_cardinality,
-        })
-        front = wandb.Table(
-            columns=["Objective {i}".format(i=i) for i in range(len(non_dominated[0].fitness.values))],
-            data=[g.fitness.values for g in non_dominated]
-        )
-        wandb.log({"eval/front": front}, commit=False)
+            "eval/spacing": self.cur_spacing,
+        }
+        if self.cur_hv_interval is not None:
+            metrics["eval/hypervolume_low"], metrics["eval/hypervolume_high"] = self.cur_hv_interval
+        start = time.perf_counter()
+        self.sink.log(metrics)
+        self.sink.log({"eval/front": front}, commit=False)
+        self.log_time = time.perf_counter() - start
 
     def end_generation(self, config, population, species_set):
         ng = len(population)
         ns = len(species_set.species)
         print('Population of {0:d} members in {1:d} species'.format(ng, ns))
         print('Hyper-volume: {0:.3f}, Sparsity: {1:.3f}, Cardinality: {2:d}'.format(self.cur_hyper_volume, self.cur_sparsity, self.cur_cardinality))
-        elapsed_time = time.time() - self.geration_start_time
+        if self.cur_hv_interval is not None:
+            print('Hyper-volume interval: [{0:.3f}, {1:.3f}]'.format(*self.cur_hv_interval))
+        if self.timing is not None:
+            figures = throughput(self.timing)
+            print('Phases: ' + ', '.join('{0} {1:.3f}s'.format(phase, self.timing[phase])
+                                         for phase in PHASES if phase in self.timing))
+            if figures['steps_per_second'] is None:
+                print('Throughput: {0:.1f} evals/sec'.format(figures['evals_per_second']))
+            else:
+                print('Throughput: {0:.1f} evals/sec, {1:.1f} steps/sec'.format(
+                    figures['evals_per_second'], figures['steps_per_second']))
+        print('Metrics logging: {0:.3f} ms'.format(self.log_time * 1000))
+        elapsed_time = time.time() - self.generation_start_time
         self.generation_times.append(elapsed_time)
-        if len(self.generation_times) > 1:
-            print('\n ****** Average generation time: {0:.3f} seconds ****** \n'.format(sum(self.generation_times)/len(self.generation_times)))
-        else: 
-            print('\n ****** Generation {0} took {1:.3f} seconds ****** \n'.format(self.generation, elapsed_time))
\ No newline at end of file
+        average = sum(self.generation_times) / len(self.generation_times)
+        print('\n ****** Generation {0} took {1:.3f} seconds ({2:.3f} average) ****** \n'.format(
+            self.generation, elapsed_time, average))
+
+    def generation_timing(self, config, generation, timing):
+        self.timing = timing
\ No newline at end of file
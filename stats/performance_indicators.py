@@ -1,16 +1,15 @@
-from copy import deepcopy
 from typing import Callable, List
 
 import numpy as np
 import numpy.typing as npt
 
-from pymoo.indicators.hv import HV
-from pymoo.indicators.igd import IGD
-from pymoo.indicators.spacing import SpacingIndicator
+from .front_metrics import igd_of, sparsity_of, spacing_of
+from .hypervolume import MAX_EXACT_OBJECTIVES, hypervolume as exact_hypervolume
 
-def hypervolume(refpoint: np.ndarray, points: List[npt.ArrayLike]):
+def hypervolume(refpoint: np.ndarray, points: List[npt.ArrayLike], max_exact_objectives: int = MAX_EXACT_OBJECTIVES):
     """
     Calculate the hypervolume of a set of points with respect to a reference point.
+    With more than max_exact_objectives objectives it is a Monte Carlo estimate.
     
     Parameters:
     -----------
@@ -18,8 +17,10 @@ def hypervolume(refpoint: np.ndarray, points: List[npt.ArrayLike]):
         The reference point for the hypervolume calculation.
     points: List[npt.ArrayLike]
         A list of points to calculate the hypervolume for.
+    max_exact_objectives: int
+        The largest number of objectives to calculate the exact hypervolume for.
     """
-    return HV(ref_point=refpoint*-1)(np.array(points)*-1)
+    return exact_hypervolume(refpoint, points, max_exact_objectives)
 
 def sparsity(front: List[npt.ArrayLike]):
     """
@@ -30,19 +31,7 @@ def sparsity(front: List[npt.ArrayLike]):
     front: List[npt.ArrayLike]
         A list of points to calculate the sparsity for.
     """
-    if len(front) < 2:
-        return 0.0
-    
-    sparsity_value = 0.0
-    m = len(front[0])
-    front = np.array(front)
-    for dim in range(m):
-        objectives = np.sort(deepcopy(front.T[dim]))
-        for i in range(1, len(front)):
-            sparsity_value += objectives[i] - objectives[i-1]
-
-    sparsity_value /= len(front) -1 
-    return sparsity_value
+    return sparsity_of(np.array(front, dtype=np.float64))
 
 
 def cardinality(front: List[npt.ArrayLike]):
@@ -68,7 +57,7 @@ def spacing(front: List[npt.ArrayLike]):
     front: List[npt.ArrayLike]
         A list of points to calculate the spacing for.
     """
-    return SpacingIndicator()(np.array(front))
+    return spacing_of(*np.unique(np.array(front, dtype=np.float64), axis=0, return_counts=True))
 
 
 def inverted_generational_distance(front: List[npt.ArrayLike], known_pareto_front: List[npt.ArrayLike]):
@@ -82,5 +71,19 @@ def inverted_generational_distance(front: List[npt.ArrayLike], known_pareto_fron
     """
     
     # Calculate the distance of each point to the closest point in the known pareto front
-    ind = IGD(np.array(known_pareto_front))
-    return ind(np.array(front))
+    return igd_of(np.unique(np.array(front, dtype=np.float64), axis=0),
+                  np.array(known_pareto_front, dtype=np.float64))[0]
+
+
+def inverted_generational_distance_plus(front: List[npt.ArrayLike], known_pareto_front: List[npt.ArrayLike]):
+    """
+    Calculate the IGD+ of a set of points, which only counts the distance in
+    the objectives where the known pareto front is better.
+    
+    Parameters:
+    -----------
+    front: List[npt.ArrayLike]
+        A list of points to calculate the IGD+ for.
+    """
+    return igd_of(np.unique(np.array(front, dtype=np.float64), axis=0),
+                  np.array(known_pareto_front, dtype=np.float64))[1]
@@ -0,0 +1,187 @@
+"""
+Metric sinks for the reporters. A sink takes dicts of metrics with the
+commit semantics of wandb.log: records logged with commit=False are merged
+into the next committed one. BufferedSink hands the records to a background
+thread, so the generation loop does not wait for the network or the disk.
+"""
+import abc
+import json
+import queue
+import threading
+import time
+
+import numpy as np
+
+
+def _plain(value):
+    # JSON-friendly values: arrays become nested lists, numpy scalars Python numbers
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class NullSink(object):
+    """
+    Drops every record.
+    """
+
+    def log(self, record, commit=True):
+        pass
+
+    def write(self, records):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class WandbSink(NullSink):
+    """
+    Logs to the current wandb run. Two-dimensional arrays, like the
+    non-dominated front, become wandb Tables with one column per objective.
+    """
+
+    def log(self, record, commit=True):
+        self.write([(record, commit)])
+
+    def write(self, records):
+        import wandb
+        for record, commit in records:
+            wandb.log({key: self._convert(wandb, value) for key, value in record.items()}, commit=commit)
+
+    @staticmethod
+    def _convert(wandb, value):
+        if isinstance(value, np.ndarray) and value.ndim == 2:
+            return wandb.Table(columns=["Objective {i}".format(i=i) for i in range(value.shape[1])],
+                               data=value.tolist())
+        return value
+
+
+class _RowSink(NullSink, metaclass=abc.ABCMeta):
+    # Merges uncommitted records into rows, one row per committed record
+    def __init__(self):
+        self.pending = {}
+
+    def log(self, record, commit=True):
+        self.write([(record, commit)])
+
+    def write(self, records):
+        rows = []
+        for record, commit in records:
+            self.pending.update((key, _plain(value)) for key, value in record.items())
+            if commit:
+                rows.append(self.pending)
+                self.pending = {}
+        if rows:
+            self.write_rows(rows)
+
+    @abc.abstractmethod
+    def write_rows(self, rows):
+        pass
+
+    def close(self):
+        if self.pending:
+            self.write_rows([self.pending])
+            self.pending = {}
+
+
+class JsonlSink(_RowSink):
+    """
+    Appends every committed record as one JSON line to filename.
+    """
+
+    def __init__(self, filename='metrics.jsonl'):
+        super().__init__()
+        self.filename = filename
+
+    def write_rows(self, rows):
+        with open(self.filename, 'a') as f:
+            f.writelines(json.dumps(row) + '\n' for row in rows)
+
+
+class ParquetSink(_RowSink):
+    """
+    Collects the committed records and writes them to the Parquet file
+    filename with pandas and pyarrow when the sink is closed, since the
+    columns can change from one record to the next.
+    """
+
+    def __init__(self, filename='metrics.parquet'):
+        super().__init__()
+        self.filename = filename
+        self.rows = []
+
+    def write_rows(self, rows):
+        self.rows.extend(rows)
+
+    def close(self):
+        super().close()
+        import pandas
+        pandas.DataFrame(self.rows).to_parquet(self.filename)
+
+
+class BufferedSink(NullSink):
+    def __init__(self, backend, max_queue=1000, batch_size=64):
+        """
+        Puts the records on a queue of at most max_queue records, which a
+        background thread drains into backend in batches of up to batch_size.
+        log only blocks when the queue is full; log_seconds adds up the time
+        spent in log, the overhead on the caller. close writes out what is
+        left and closes the backend.
+        """
+        self.backend = backend
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.log_seconds = 0.0
+        self.error = None
+        self.thread = threading.Thread(target=self._drain, daemon=True)
+        self.thread.start()
+
+    def _drain(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            closing = batch[-1] is None
+            records = [item for item in batch if item is not None]
+            try:
+                if records and self.error is None:
+                    self.backend.write(records)
+            except Exception as e:
+                # Reported by the next log or flush
+                self.error = e
+            for _ in batch:
+                self.queue.task_done()
+            if closing:
+                return
+
+    def _raise(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise RuntimeError("Metrics sink failed") from error
+
+    def log(self, record, commit=True):
+        start = time.perf_counter()
+        self._raise()
+        self.queue.put((record, commit))
+        self.log_seconds += time.perf_counter() - start
+
+    def flush(self):
+        self.queue.join()
+        self._raise()
+        self.backend.flush()
+
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        self._raise()
+        self.backend.close()
@@ -0,0 +1,59 @@
+from neat.reporting import BaseReporter
+import json
+
+
+PHASES = ('evaluate', 'sort', 'reproduce', 'speciate')
+
+
+def throughput(timing):
+    """
+    Per-generation throughput figures from the generation_timing event of
+    NSGA2Population.run. Rates are per second of evaluation time. The step
+    and activation figures are None when the evaluation recorded none, e.g.
+    with a fitness function that does not count its work.
+    """
+    total = sum(timing.get(phase, 0.0) for phase in PHASES)
+    evaluate = timing['evaluate']
+    measured = timing['steps'] > 0 or timing['activations'] > 0
+    figures = {phase + '_seconds': timing[phase] for phase in PHASES if phase in timing}
+    figures.update({
+        'generation_seconds': total,
+        'genomes': timing['genomes'],
+        'steps': timing['steps'] if measured else None,
+        'activations': timing['activations'] if measured else None,
+        'evals_per_second': timing['genomes'] / evaluate if evaluate > 0 else 0.0,
+        'steps_per_second': None,
+        'activations_per_second': None,
+    })
+    if measured:
+        figures['steps_per_second'] = timing['steps'] / evaluate if evaluate > 0 else 0.0
+        figures['activations_per_second'] = timing['activations'] / evaluate if evaluate > 0 else 0.0
+    return figures
+
+
+class ThroughputReporter(BaseReporter):
+    """
+    Writes the phase times and throughput of every generation as one JSON
+    line to filename, and with log_wandb to wandb as well, or to sink, one
+    of stats.sinks. The figures are not committed on their own, they go out
+    with the next metrics MOReporter logs.
+    """
+
+    def __init__(self, filename='throughput.jsonl', log_wandb=False, sink=None) -> None:
+        self.filename = filename
+        self.log_wandb = log_wandb
+        self.sink = sink
+        self.history = []
+
+    def generation_timing(self, config, generation, timing):
+        figures = throughput(timing)
+        figures['generation'] = generation
+        self.history.append(figures)
+        with open(self.filename, 'a') as f:
+            f.write(json.dumps(figures) + '\n')
+        prefixed = {'throughput/' + key: value for key, value in figures.items()}
+        if self.sink is not None:
+            self.sink.log(prefixed, commit=False)
+        elif self.log_wandb:
+            import wandb
+            wandb.log(prefixed, commit=False)
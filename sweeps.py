@@ -8,6 +8,8 @@ import neat.config
 from nsga2.fitness import NSGA2Fitness
 from nsga2.population import NSGA2Population
 from nsga2.reproduction import NSGA2Reproduction
+from nsga2.species import select_species_set
+from nsga2.rollout import LockstepEvaluator
 from stats.moreporter import MOReporter
 from stats.performance_indicators import hypervolume
 
@@ -57,8 +59,8 @@ def create_neat_config(config):
         temp_config_file.write(in_memory_config.encode())
         temp_config_file_path = temp_config_file.name
 
-    neat_config = neat.config.Config(neat.DefaultGenome, NSGA2Reproduction,
-                        neat.DefaultSpeciesSet, neat.DefaultStagnation, temp_config_file_path)
+    neat_config = select_species_set(neat.config.Config(neat.DefaultGenome, NSGA2Reproduction,
+                        neat.DefaultSpeciesSet, neat.DefaultStagnation, temp_config_file_path))
     
     os.remove(temp_config_file_path)
     return neat_config
@@ -99,7 +101,15 @@ def objective(config):
     stats = neat.StatisticsReporter()
     p.add_reporter(stats)
 
-    winners, non_dominant = p.run(eval_genomes, config.num_generations)
+    # Genomes evaluated in lockstep with batched networks; 1 evaluates them one by one, as earlier sweeps did
+    num_lanes = getattr(config, 'num_lanes', 1)
+    if num_lanes > 1:
+        evaluator = LockstepEvaluator("mo-swimmer-v4", num_lanes, neat.nn.FeedForwardNetwork,
+                                      action_function=lambda output: np.clip(output, -1, 1), batched=True)
+        winners, non_dominant = p.run(evaluator.evaluate, config.num_generations)
+        evaluator.close()
+    else:
+        winners, non_dominant = p.run(eval_genomes, config.num_generations)
 
     return hypervolume(np.array([-100, -100]), [g.fitness.values for g in non_dominant])
 
@@ -151,6 +161,9 @@ sweep_config = {
             'min': 0.1,
             'max': 0.9,
         },
+        'num_lanes': {
+            'value': 1
+        },
     }
 }
 
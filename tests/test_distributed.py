@@ -0,0 +1,98 @@
+"""
+A coordinator on localhost with two worker processes, as a distributed run
+uses them: results, the counts sent back, requeueing of a lost batch and
+dropping of batches that are already done.
+"""
+import multiprocessing
+import os
+import secrets
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from nsga2.distributed import DistributedEvaluator, DistributedWorker
+from nsga2.instrumentation import counters, record
+
+
+class Genome(object):
+    def __init__(self, key):
+        self.key = key
+        self.fitness = None
+
+
+def evaluate_genome(genome, config):
+    # The first worker to get the slow genome holds it past the timeout
+    if genome.key == config.get('slow'):
+        try:
+            os.close(os.open(config['marker'], os.O_CREAT | os.O_EXCL))
+            time.sleep(config['delay'])
+        except FileExistsError:
+            pass
+    record(steps=10, activations=20)
+    return [float(genome.key), -float(genome.key)]
+
+
+def run_worker(port, authkey):
+    DistributedWorker('127.0.0.1', port, evaluate_genome, authkey, poll_interval=0.01, give_up_after=5.0).run()
+
+
+@pytest.fixture
+def coordinator():
+    authkey = secrets.token_hex(32)
+    evaluator = DistributedEvaluator(0, authkey, batch_size=3, timeout=1.0, host='127.0.0.1')
+    workers = [multiprocessing.Process(target=run_worker, args=(evaluator.address[1], authkey), daemon=True)
+               for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    yield evaluator
+    for worker in workers:
+        worker.terminate()
+        worker.join()
+
+
+def evaluate(evaluator, keys, config):
+    genomes = [(key, Genome(key)) for key in keys]
+    work = counters.snapshot()
+    evaluator.evaluate(genomes, config)
+    return genomes, counters.since(work)
+
+
+def test_results_and_counts(coordinator):
+    for generation in range(3):
+        keys = range(generation * 20, generation * 20 + 20)
+        genomes, work = evaluate(coordinator, keys, {})
+        for key, genome in genomes:
+            assert list(genome.fitness.values) == [key, -key]
+        assert work == {'steps': 200, 'activations': 400}
+
+
+def test_lost_batch_is_requeued(coordinator, tmp_path):
+    config = {'slow': 4, 'marker': str(tmp_path / 'slow'), 'delay': 3.0}
+    genomes, work = evaluate(coordinator, range(12), config)
+    assert coordinator.requeued >= 1
+    for key, genome in genomes:
+        assert list(genome.fitness.values) == [key, -key]
+    # Only the counts of the batches that were used
+    assert work == {'steps': 120, 'activations': 240}
+
+    # The late result of the first attempt does not leak into the next generation
+    time.sleep(3.0)
+    genomes, work = evaluate(coordinator, range(100, 106), config)
+    for key, genome in genomes:
+        assert list(genome.fitness.values) == [key, -key]
+    assert work == {'steps': 60, 'activations': 120}
+
+
+def test_done_batches_are_dropped(coordinator):
+    evaluate(coordinator, range(6), {})
+    # A copy of a batch whose results are in
+    coordinator.tasks.put((0, {}, [(0, Genome(0))], [0]))
+    deadline = time.time() + 5.0
+    while not coordinator.tasks.empty() and time.time() < deadline:
+        time.sleep(0.05)
+    assert coordinator.tasks.empty()
+    time.sleep(0.2)
+    assert coordinator.results.empty()
@@ -0,0 +1,80 @@
+"""
+The hypervolumes of stats/hypervolume.py against pymoo: exact values for two
+to five objectives, the incremental hypervolume over a front that changes
+every generation, and the interval of the Monte Carlo estimate.
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+from pymoo.indicators.hv import HV
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from nsga2.sorting import iter_non_dominated_fronts
+from stats.hypervolume import IncrementalHypervolume, hypervolume, monte_carlo_hypervolume
+
+
+def pymoo_hypervolume(ref_point, points):
+    return HV(ref_point=-ref_point)(-points)
+
+
+def random_front(rng, n, m):
+    # Points on a concave surface, spread out in front of the reference point
+    points = np.abs(rng.normal(size=(n, m)))
+    points /= np.linalg.norm(points, axis=1, keepdims=True)
+    return points * 100 - 50 + rng.normal(scale=5, size=(n, m))
+
+
+def non_dominated(points):
+    return points[next(iter_non_dominated_fronts(points))]
+
+
+@pytest.mark.parametrize('m', [2, 3, 4, 5])
+@pytest.mark.parametrize('n', [1, 10, 150])
+def test_exact_matches_pymoo(m, n):
+    rng = np.random.default_rng(m * 1000 + n)
+    ref_point = np.full(m, -100.0)
+    for _ in range(5):
+        # Dominated points and points behind the reference point included
+        points = random_front(rng, n, m)
+        points[:n // 10] = ref_point - 1
+        assert hypervolume(ref_point, points) == pytest.approx(pymoo_hypervolume(ref_point, points), rel=1e-9)
+
+
+def test_ties_and_empty_fronts():
+    ref_point = np.zeros(2)
+    points = np.array([[1.0, 3.0], [1.0, 3.0], [2.0, 2.0], [3.0, 1.0], [2.0, 1.0], [0.0, 5.0]])
+    assert hypervolume(ref_point, points) == pytest.approx(6.0)
+    assert hypervolume(ref_point, np.empty((0, 2))) == 0.0
+    assert hypervolume(np.zeros(3), np.array([[1.0, 1.0, 0.0]])) == 0.0
+
+
+@pytest.mark.parametrize('m', [2, 3])
+def test_incremental_matches_pymoo(m):
+    rng = np.random.default_rng(m)
+    ref_point = np.full(m, -100.0)
+    incremental = IncrementalHypervolume(ref_point)
+    pool = random_front(rng, 200, m)
+    for generation in range(50):
+        pool[rng.integers(len(pool), size=5)] = random_front(rng, 5, m)
+        # Dominated points now and then, which a later removal can uncover
+        front = pool if generation % 10 == 0 else non_dominated(pool)
+        expected = pymoo_hypervolume(ref_point, front)
+        assert incremental.update(front) == pytest.approx(expected, rel=1e-9)
+
+
+@pytest.mark.parametrize('m', [4, 6])
+def test_monte_carlo_interval_holds_exact_value(m):
+    rng = np.random.default_rng(m)
+    ref_point = np.full(m, -100.0)
+    points = non_dominated(random_front(rng, 30, m))
+    expected = pymoo_hypervolume(ref_point, points)
+    covered = 0
+    for _ in range(20):
+        value, (low, high) = monte_carlo_hypervolume(ref_point, points, rng=rng)
+        assert value == pytest.approx(expected, rel=0.05)
+        covered += low <= expected <= high
+    # 95% intervals
+    assert covered >= 16
@@ -0,0 +1,97 @@
+"""
+Every sort backend of NSGA2Reproduction against the original
+fast_non_dominated_sort, on random and on heavily tied populations: the same
+fronts, the same ranks, and members in the order of the Python sort for
+'numpy' and in population order for the others. The selection of survivors
+does not depend on that order, see NSGA2Reproduction.sort.
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from nsga2.fitness import NSGA2Fitness
+from nsga2.reproduction import NSGA2Reproduction
+from nsga2.sorting import select_sort_algorithm, vectorized_non_dominated_sort
+
+
+class Genome(object):
+    def __init__(self, key, values):
+        self.key = key
+        self.fitness = NSGA2Fitness(0.0, values)
+
+
+def populations(m, seed=42, sizes=(1, 2, 10, 50, 200), repeat=3):
+    rng = np.random.default_rng(seed)
+    for n in sizes:
+        for _ in range(repeat):
+            yield rng.normal(size=(n, m))
+            # Few distinct values: many ties in single objectives and duplicate points
+            yield rng.integers(0, 3, size=(n, m)).astype(np.float64)
+            yield rng.integers(0, 10, size=(n, m)).astype(np.float64)
+
+
+@pytest.fixture
+def reproduction():
+    # The sorts only keep the front structure of the incremental backend as state
+    reproduction = NSGA2Reproduction.__new__(NSGA2Reproduction)
+    reproduction.parent_fronts = None
+    return reproduction
+
+
+def sort_results(sort, population):
+    F = sort(population)
+    # The backends return a dict of fronts by index, the lazy sort a generator
+    fronts = [list(F[i]) for i in range(len(F))] if isinstance(F, dict) else [list(front) for front in F]
+    # The Python and NumPy sorts end with an empty front, the lazy sort does not
+    fronts = [front for front in fronts if front]
+    return fronts, {key: g.fitness.rank for key, g in population.items()}
+
+
+SORTS = {
+    'numpy': 'vectorized_non_dominated_sort',
+    'sweep': 'sweep_non_dominated_sort',
+    'best_order': 'best_order_sort',
+    'auto': 'auto_non_dominated_sort',
+    'lazy': 'lazy_non_dominated_sort',
+    'incremental': 'incremental_non_dominated_sort',
+}
+
+
+@pytest.mark.parametrize('m', [2, 3, 4])
+@pytest.mark.parametrize('backend', sorted(SORTS))
+def test_backend_matches_python_sort(reproduction, backend, m):
+    if backend == 'sweep' and m != 2:
+        pytest.skip('the sweep is for two objectives')
+    sort = getattr(reproduction, SORTS[backend])
+    for objectives in populations(m):
+        population = {k: Genome(k, list(v)) for k, v in enumerate(objectives)}
+        expected, expected_ranks = sort_results(reproduction.fast_non_dominated_sort, population)
+        in_population_order = [sorted(front) for front in expected]
+
+        reproduction.parent_fronts = None
+        fronts, ranks = sort_results(sort, population)
+        if backend == 'numpy' or (backend == 'auto' and
+                                  select_sort_algorithm(*objectives.shape) is vectorized_non_dominated_sort):
+            assert fronts == expected
+        else:
+            assert fronts == in_population_order
+        assert ranks == expected_ranks
+
+
+@pytest.mark.parametrize('m', [2, 3, 4])
+def test_incremental_insertion_matches_python_sort(reproduction, m):
+    for objectives in populations(m, sizes=(2, 10, 50, 200)):
+        n = len(objectives)
+        population = {k: Genome(k, list(v)) for k, v in enumerate(objectives)}
+        expected, expected_ranks = sort_results(reproduction.fast_non_dominated_sort, population)
+
+        # Half of the population is inserted into the kept fronts of the other half
+        reproduction.parent_fronts = None
+        reproduction.incremental_non_dominated_sort({key: g for key, g in population.items() if key < n // 2})
+        fronts, ranks = sort_results(reproduction.incremental_non_dominated_sort, population)
+        assert fronts == [sorted(front) for front in expected]
+        assert ranks == expected_ranks